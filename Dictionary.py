@@ -1,186 +1,139 @@
 # This file computes a dictionary of words for the set of reviews of a given yelp area as it is used in the LDA analysis. The dictionary is specified to contain the x 
 # most common words in the reviews of a given area (x is currently set to 1,000); the code also computes the list of all words that occur in negative reviews
-# (negative defined as a star rating of less than 3); the words in these lists are ordered by frequency of occurence. Between lines 111 and 123 a method to decide 
+# (negative defined as a star rating of less than 3); the words in these lists are ordered by frequency of occurence. Further below a method to decide 
 # exploratorily how many words to include is outlined. The final dictionary is saved as dictionary.txt
 
 ### In addition, the code computes the Monroe score (see http://pan.oxfordjournals.org/content/16/4/372 by B. Monroe, at al. (2008)) for all words which are associated 
 # with negative reviews, as outlined in http://firstmonday.org/ojs/index.php/fm/article/view/4944/3863 by D. Jurafsky et al. (2014); these words as well as well as their
-# Monroe scores are saved as monroe.csv
+# Monroe scores are saved as monroe.csv. The scores are computed for all words at once from the word counts per star rating (see logodds.py); the log odds
+# ratios, variances and z-scores of the bad against the good reviews over the full vocabulary are saved as log_odds.csv
 
-# We load the yelp data and store the reviews
+# The reviews are streamed from the .json file and counted one review at a time (see count_words), so that memory use is bounded by the size of the 
+# vocabulary rather than by the size of the review corpus. Note that the part of speech tags used to strip plurals are therefore computed per review
+# rather than over the concatenated text of all (or all bad) reviews as before, so dictionary.txt and monroe.csv can differ slightly from those of
+# the earlier version of this script (see tokens.py)
+
+# the script is run using the command
+#	python Dictionary.py [size]
+# where size is the number of words in the dictionary (1000 by default), a proportion of all word occurences to cover (e.g. 0.9) or elbow
 
 # we load the required packages
-import os, json, nltk, csv
-from nltk.tokenize import RegexpTokenizer
-from nltk.probability import *
+import os, io, sys, csv
+import numpy as np
 from collections import Counter
-from nltk.corpus import stopwords
-import math
-import matplotlib.pyplot as plt
-
-# change working directory
-directory_default = os.getcwd()
-user = os.environ['HOME']
-directory = user  + '/Dropbox/REVIEWS_CODES/Final_Code/Yelp_Data_Set/Data_Sets_Madison'
-os.chdir(directory)
-
-# we define the tokenizer
-tokenizer = RegexpTokenizer(r'\w+')
-
-# load the review data
-with open('reviews_Madison.json') as fp: 
-	Madison = json.load(fp)   
-
-# we will create one string containing every work in all the reviews (text_full), and one that contains all the words
-# which show up in bad reviews (text_bad) with bad defined as having a rating of 2 or lower
-
-# define arrays to hold results
-review_list = [[],[]]
-text_full = ''
-text_bad = ''
-
-# we loop over the entire data set to get all the (bad) reviews in one list, as well as strings containing them
-for i in range(len(Madison)):
-	review_list[0].append(Madison[i]['stars'])
-	review_list[1].append(Madison[i]['text'])
-	text_full = text_full + ' ' + Madison[i]['text']
-	if Madison[i]['stars'] <= 2:
-		text_bad = text_bad + ' ' + Madison[i]['text']
-
-# we list all bad reviews (review_list[1] is the list of all reviews)
-review_bad = [review_list[1][i] for i in range(len(review_list[1])) if review_list[0][i] <= 2]
-
-# we now edit the strings to make words for comparable
-
-# we set each word in the review strings to be lower case
-text_full = text_full.lower()
-text_bad = text_bad.lower()
-
-# we count words for both the set of all reviews and the set of all bad reviews; the results are stored in list format 
-# (note: the elements of these lists are NOT strings, but rather pairs of strings (words) and integers (their frequencies))
-text_word_full = tokenizer.tokenize(text_full)
-text_word_bad = tokenizer.tokenize(text_bad)
-
-# we remove stopwords from our lists
-text_word_full = [i for i in text_word_full if not i in stopwords.words('english')]
-text_word_bad = [i for i in text_word_bad if not i in stopwords.words('english')]
-
-# we tokenize the list of words that should up in every review and all bad reviews, respectively; this will add a feature to each word that indicates
-# whether it is e.g. a verb or a noun, or plural etc.
-text_word_full_token = nltk.pos_tag(text_word_full)
-text_word_bad_token = nltk.pos_tag(text_word_bad)
-
-# we reduce words in plural to their singular by deleting an 's' at the end of the word, if it is in plural
-for i in range(len(text_word_full)):
-	if (text_word_full_token[i][1] == 'NNS' and text_word_full[i][len(text_word_full[i])-1]=='s'):
-		text_word_full[i] = text_word_full[i][:-1]
-
-for i in range(len(text_word_bad)):
-	if (text_word_bad_token[i][1] == 'NNS' and text_word_bad[i][len(text_word_bad[i])-1]=='s'):
-		text_word_bad[i] = text_word_bad[i][:-1]
-
-# We now create lists of the most frequent words in all our reviews and all bad reviews; these lists will serve as the dictionaries
-# for the LDA analysis; we choose the 10000 most frequent words; alternatively, we could restrain our dictionary to only contain words
-# which show up at least a certain number of times
-
-# we compute each word's frequency in bad reviews and the total of all reviews
-fd_full = nltk.FreqDist(text_word_full)
-fd_full.count = Counter(fd_full)
-
-fd_bad = nltk.FreqDist(text_word_bad)
-fd_bad.count = Counter(fd_bad)
-
-# We store the frequencies and the words in all reviews; full_count is a list of the frequencies of each word that shows up in the reviews;
-# full_word is the corresponding list of words; full_word1 is a list of all words in the reviews that show up at least twice
-full_count = [fd_full.count.most_common()[i][1] for i in range(len(fd_full.count.most_common()))]
-full_word1 = [fd_full.count.most_common()[i][0] for i in range(len(fd_full.count.most_common())) if fd_full.count.most_common()[i][1]>1]
-full_word = [fd_full.count.most_common()[i][0] for i in range(len(fd_full.count.most_common()))]
-
-# We store the frequencies and the words in bad reviews; bad_count is a list of the frequencies of each word that shows up in bad reviews;
-# bad_word is the corresponding list of words; bad_word1 is a list of all words in bad reviews that show up at least twice
-bad_count = [fd_bad.count.most_common()[i][1] for i in range(len(fd_bad.count.most_common()))]
-bad_word1 = [fd_bad.count.most_common()[i][0] for i in range(len(fd_bad.count.most_common())) if fd_bad.count.most_common()[i][1]>1]
-bad_word = [fd_bad.count.most_common()[i][0] for i in range(len(fd_bad.count.most_common()))]
-
-# we compute the restricted dictionary (to the 1,000 most frequent ones)
-restricted_dict = [fd_full.count.most_common()[i][0] for i in range(1000)]
-text_word_full_restricted = [i for i in text_word_full if i in restricted_dict]
-
-# we list all the words among the 10,000 most frequent words that occur in bad reviews
-text_word_bad_restricted = [i for i in text_word_bad if i in restricted_dict]
-
-# alternatively, we can decide how many words to include in the dictionary by computing the cumulative proportion of the most frequent
-# words relative to the total size of the reviews. Plotting the cumulative proportion against the index (in full_count) will give a
-# strictly increasing plot. If we then pick the smallest index, say n, for which the slope of this plot is close to zero, then then only using 
-# words 1 to n from full_count will give us a dictionary that contains the most relevant words (also, using words that appear in most reviews will
-# improve the the LDA analysis)
-#cumulative_full = []
-#for i in range(len(full_count)):
-#	cumulative_full.append(sum(full_count[0:i]))
-#
-#plt.plot(cumulative_full)
-#plt.ylabel('total number of occurences')
-#plt.xlabel('index')
-#plt.show()
-
-# We will now compute the Monroe score (log odds ratio ratio) on the restricted dictionary; see D. Jurafsky et al. (2014), Section 2
-
-# we update our frequency counts:
-text_word_full_restricted = [i for i in text_word_full if i in restricted_dict]
-text_word_bad_restricted = [i for i in text_word_bad if i in restricted_dict]
-
-# we update our frequency counts:
-fd_full_restricted = nltk.FreqDist(text_word_full_restricted)
-fd_bad_restricted = nltk.FreqDist(text_word_bad_restricted)
-
-fd_bad_restricted.count = Counter(fd_bad_restricted)
-bad_word_restricted= [fd_bad_restricted.count.most_common()[i][0] for i in range(len(fd_bad_restricted.count.most_common()))]
-
-a_0 = len(text_word_full_restricted)
-n_b = len(text_word_bad_restricted)
-
-# we define a function to compute the Monroe score for a word i; here
-# a_0 is the size of the corpus of all reviews, n_b the size of the corpus of bad reviews,
-# y_i is the frequency of word i in the corpus of all reviews, yb_i the frequency in the corpus of bad reviews;
-def monroe(i):
+from reviews import iter_reviews
+from columnar import ReviewStore
+from tokens import TokenPipeline, batches
+from context import get_context
+from logodds import RatingCounts, score_split
+from vocabulary import ranked, coverage_size, elbow_size
+from instrument import Stage, counted
+
+def count_words(reviews, batch_size=1000):
+	""" counts the words in the reviews with each star rating in a single pass over reviews; the reviews are normalized by the token pipeline 
+	(lower case, no stopwords, plurals reduced to their singular) in batches of batch_size reviews; returns the counts as RatingCounts (see
+	logodds.py), from which the counts of all reviews or of the reviews with any set of ratings are obtained """
+	pipeline = TokenPipeline()
+	codes = {}
+	by_rating = {}
+	for batch in batches(reviews, batch_size):
+		docs = pipeline([review['text'] for review in batch])
+		for review, words in zip(batch, docs):
+			by_rating.setdefault(int(review['stars']), Counter()).update([codes.setdefault(w, len(codes)) for w in words])
+	return RatingCounts.build(codes, by_rating)
+
+def main(size=1000):
 	"""
-	Monroe statistic for word i
+	Computes the dictionary and the Monroe scores for the Madison reviews and stores them as dictionary.txt and monroe.csv 
+	in the Data_Sets_Madison folder; the dictionary contains the size most frequent words, where size can also be a proportion below 1 (the
+	smallest number of words that cover this proportion of all word occurences) or 'elbow' (the elbow of the coverage curve), see vocabulary.py
 	"""
-	y_i = fd_full_restricted[i]
-	yb_i = fd_bad_restricted[i]
-	a_i = y_i
-	#
-	A_10 = float(yb_i + a_i) 
-	A_11 = float(n_b + a_0  - A_10)
-	A_20 = float(y_i + a_i) 
-	A_21 = float(a_0 + a_0  - A_20)
-	#
-	m = math.log(A_10/A_11) - math.log(A_20/A_21)
-	#
-	return(m)
-
-# we compute the Monroe score for each word that occurs in the corpus of bad reviews and store them in a dictionary
-monroe_scores = {}
-
-for i in bad_word_restricted:
-	c = monroe(i)
-	monroe_scores[i] = c
-
-# we also compute a dictionary of all words which have a positive Monroe score; these are the words that are more associated with bad reviews
-monroe_bad = {}
-
-for i in bad_word_restricted:
-	c = monroe(i)
-	if c>0:
-		monroe_bad[i] = c
-
-# we save our new dictonary with the dictionary of words associated with bad reviews:
-os.chdir(directory)
-with open('dictionary.txt','w') as f:
-	for s in restricted_dict:
-		f.write(s.encode('utf8') + '\n')
-
-writer = csv.writer(open('monroe.csv','wb'))
-for key, value in monroe_bad.items():
-	s = [key.encode('utf8'),value]
-	writer.writerow(s)
+	# change working directory
+	directory = get_context().directory
+	os.chdir(directory)
+
+	# we count words for both the set of all reviews and the set of all bad reviews, with bad defined as having a rating of 2 or lower; the reviews
+	# are read from the columnar store if the review data has been converted (see columnar.py)
+	if os.path.isdir('reviews_Madison_store'):
+		reviews = ReviewStore('reviews_Madison_store').reviews(fields=('stars', 'text'))
+	else:
+		reviews = iter_reviews('reviews_Madison.json')
+	with Stage('dictionary.count', unit='reviews') as stage:
+		counts = count_words(counted(reviews, stage))
+		stage.fields['words'] = len(counts.words)
+	words = np.array(counts.words, dtype=object)
+	y_full = counts.corpus()
+	y_bad = counts.corpus(stars=(1, 2))
+
+	# We now create lists of the most frequent words in all our reviews and all bad reviews; these lists will serve as the dictionaries
+	# for the LDA analysis; we choose the 1000 most frequent words; alternatively, we could restrain our dictionary to only contain words
+	# which show up at least a certain number of times. The words are sorted by their counts once (see vocabulary.py)
+
+	# We store the frequencies and the words in all reviews; full_count is a list of the frequencies of each word that shows up in the reviews;
+	# full_word is the corresponding list of words; full_word1 is a list of all words in the reviews that show up at least twice
+	full_order = ranked(y_full)
+	full_count = y_full[full_order]
+	full_word = words[full_order]
+	full_word1 = full_word[full_count > 1]
+
+	# We store the frequencies and the words in bad reviews; bad_count is a list of the frequencies of each word that shows up in bad reviews;
+	# bad_word is the corresponding list of words; bad_word1 is a list of all words in bad reviews that show up at least twice
+	order = ranked(y_bad)
+	order = order[y_bad[order] > 0]
+	bad_count = y_bad[order]
+	bad_word = words[order]
+	bad_word1 = bad_word[bad_count > 1]
+
+	# alternatively to a fixed number of words, we can decide how many words to include in the dictionary by computing the cumulative proportion of 
+	# the most frequent words relative to the total size of the reviews (the coverage). Plotting the cumulative proportion against the index (in 
+	# full_count) will give a strictly increasing plot. If we then pick the index, say n, after which the slope of this plot is close to zero (its 
+	# elbow), then then only using words 1 to n from full_count will give us a dictionary that contains the most relevant words (also, using words 
+	# that appear in most reviews will improve the the LDA analysis); see vocabulary.py
+	if size == 'elbow':
+		size = elbow_size(y_full)
+	elif float(size) < 1:
+		size = coverage_size(y_full, float(size))
+	size = int(size)
+
+	# we compute the restricted dictionary (to the size, by default 1,000, most frequent ones), the first words of the ranking above
+	with Stage('dictionary.select', unit='words', items=len(words), size=size):
+		columns = full_order[:size]
+		restricted_dict = words[columns].tolist()
+
+	# We will now compute the Monroe score (log odds ratio ratio) on the restricted dictionary; see D. Jurafsky et al. (2014), Section 2
+
+	# the log odds ratios of the bad reviews against all reviews are computed for all words of the restricted dictionary at once, with the counts of all
+	# reviews as the prior (see logodds.py); a_0, the size of the restricted corpus of all reviews, and n_b, the size of the restricted corpus of bad 
+	# reviews, are computed from the restricted counts
+	delta, variance, z = score_split(counts, stars_i=(1, 2), columns=columns)
+	y_bad_restricted = y_bad[columns]
+
+	# we compute the Monroe score for each word that occurs in the corpus of bad reviews and store them in a dictionary
+	monroe_scores = dict((restricted_dict[i], delta[i]) for i in np.nonzero(y_bad_restricted > 0)[0])
+
+	# we also compute a dictionary of all words which have a positive Monroe score; these are the words that are more associated with bad reviews
+	monroe_bad = dict((restricted_dict[i], delta[i]) for i in np.nonzero((y_bad_restricted > 0) & (delta > 0))[0])
+
+	# the log odds ratios, their variances and z-scores of the bad reviews (1 or 2 stars) against the good reviews (4 or 5 stars) are computed for
+	# the full vocabulary and saved as log_odds.csv; the counts per rating are saved as rating_counts.npz, so that other splits can be scored later
+	counts.save('rating_counts.npz')
+	delta_full, variance_full, z_full = score_split(counts, stars_i=(1, 2), stars_j=(4, 5))
+	y_good = counts.corpus(stars=(4, 5))
+	with open('log_odds.csv', 'w') as fp:
+		writer = csv.writer(fp)
+		writer.writerow(['word', 'bad_count', 'good_count', 'log_odds', 'variance', 'z'])
+		for i in np.argsort(-z_full, kind='mergesort'):
+			writer.writerow([counts.words[i], y_bad[i], y_good[i], delta_full[i], variance_full[i], z_full[i]])
+
+	# we save our new dictonary with the dictionary of words associated with bad reviews:
+	os.chdir(directory)
+	with io.open('dictionary.txt', 'w', encoding='utf8') as f:
+		for s in restricted_dict:
+			f.write(s + u'\n')
+
+	with open('monroe.csv', 'w') as fp:
+		writer = csv.writer(fp)
+		for key, value in monroe_bad.items():
+			writer.writerow([key, value])
+
+if __name__ == '__main__':	main(*sys.argv[1:2])
@@ -1,63 +1,115 @@
 # This code implements the the classical Latent Dirichlet Allocation (LDA) for the yelp data. It is different from the version written by David Blei et al. in
 # HoffmanBleiBach2010b.pdf as it is not an online algorithm (the version here is sometimes referred to as the 'batch' version). The code presented here uses 
 # collapsed Gibbs sampling just as the R code version of the code that we have used before; this python version of the algorithm is a lot faster though and 
-# more convenient to work with since the rest of the code for the review data is also written in python (so that now everything is written in the same language)
+# more convenient to work with since the rest of the code for the review data is also written in python (so that now everything is written in the same language);
+# the online version is available through fit_online() below, which is meant for updating the topics with newly arriving reviews
 
 # the code requires a .json file of reviews as well as a dictionary in .txt format. It then processes the review data and brings it into a 'bag of words' format
 # (each review now is a nx1 dimensional array with n being the size of the dictionary, its ith entry is the number of times the ith word in the dictionary occurs
-# in the review); it then uses the formatted data to compute document and topic loadings;
+# in the review; since most entries are zero, the reviews are stored as the rows of a sparse matrix); it then uses the formatted data to compute document and topic loadings;
 
-def setting():
-	""" computes 'bag of words' representation of Madison data using the dictionary we specified in dictionary.txt; its 
-	output is used for the LDA algorithm """
+def count_matrix(docs, vocab_map):
+	""" computes the sparse 'bag of words' matrix (in CSR format) of the tokenized reviews docs; vocab_map specifies which column
+	corresponds to which word in the dictionary; words that are not in the dictionary are ignored """
 
 	# we load required packages
-	import os, json, string, re, numpy, lda
-	import matplotlib.pyplot as plt
+	import numpy, scipy.sparse
+
+	# we count the words of each review with one dictionary lookup per token and store the counts of the review in sorted column order
+	indptr = [0]
+	indices = []
+	data = []
+	for words in docs:
+		cts = {}
+		for w in words:
+			j = vocab_map.get(w)
+			if j is not None:
+				cts[j] = cts.get(j, 0) + 1
+		columns = sorted(cts)
+		indices.extend(columns)
+		data.extend([cts[j] for j in columns])
+		indptr.append(len(indices))
+
+	return scipy.sparse.csr_matrix((numpy.array(data, numpy.int32), numpy.array(indices, numpy.int32), numpy.array(indptr, numpy.int64)),
+		shape=(len(docs), len(vocab_map)))
+
+def load_counts():
+	""" loads the sparse 'bag of words' matrix of the Madison data as saved by setting() """
+
+	# we load required packages
+	import os, scipy.sparse
+
+	from context import get_context
+	directory = get_context().directory
+	return scipy.sparse.load_npz(os.path.join(directory, 'reviews_cts.npz'))
+
+# the featurization of the reviews can be split across several processes; each worker process holds its own token pipeline and vocab_map, which are
+# set up once by init_featurize, and computes the count matrix of one chunk of reviews at a time
+featurize_state = {}
+
+def init_featurize(vocab):
+	""" sets up the token pipeline and vocab_map for the dictionary vocab in the current process """
+	from tokens import TokenPipeline
+	featurize_state['pipeline'] = TokenPipeline(vocab=vocab)
+	featurize_state['vocab_map'] = dict((vocab[i], i) for i in range(0,len(vocab)))
+
+def featurize(texts):
+	""" computes the sparse 'bag of words' matrix of the review texts using the setup of init_featurize """
+	return count_matrix(featurize_state['pipeline'](texts), featurize_state['vocab_map'])
+
+def setting(n_jobs=1, chunk_size=10000, reviews='reviews_Madison.json', output='reviews_cts.npz'):
+	""" computes 'bag of words' representation of Madison data using the dictionary we specified in dictionary.txt as a sparse
+	matrix; its output is used for the LDA algorithm; the reviews are processed in chunks of chunk_size reviews by n_jobs processes
+	(the result does not depend on n_jobs); a different file of reviews (e.g. newly arrived reviews) and output file can be specified """
+
+	# we load required packages
+	import os, scipy.sparse, multiprocessing
+	from reviews import iter_reviews
+	from columnar import ReviewStore
+	from tokens import batches
+	from instrument import Stage
 
 	# change working directory
 	directory_default = os.getcwd()
-	user = os.environ['HOME']
-	directory = user  + '/Dropbox/REVIEWS_CODES/Final_Code/Yelp_Data_Set/Data_Sets_Madison'
+	from context import get_context
+	directory = get_context().directory
 	os.chdir(directory)
 
-	# load the review data and dictionary
-	with open('reviews_Madison.json') as fp: 
-		Madison = json.load(fp)   
-
+	# load the dictionary
 	with open('dictionary.txt') as f:
 		vocab = [line.rstrip('\n') for line in f]
 
-	# we load the review texts
-	docs = []
-	for d in Madison:
-		docs.append(d['text'])
-
-	# we write a dictionary that specifies which word in the dictionary corresponds to which entry in the review arrays
-	vocab_map = {}
-	for i in range(0,len(vocab)):
-		vocab_map[vocab[i]] = i
-
-	D = len(docs)
-
-	# wordcts is a list of lists, each of which corresponds to a review array; running this for all reviews takes a bit of time (a few minutes); these outputs can
-	# be saved to be used when implementing the LDA again at a later point in time.
-	wordcts = list()
-	for d in range(0, D):
-		# we format the review texts to ignore puctuation and capital letters etc.
-		docs[d] = docs[d].lower()
-		docs[d] = re.sub(r'\n\n', ' ',docs[d])
-		docs[d] = re.sub(r'[^a-z ]', ' ', docs[d])
-		words = string.split(docs[d])
-		cts = []
-		for w in vocab:
-			n = words.count(w)
-			cts.append(n)
-		wordcts.append(cts)
-
-	# we save the formatted review data
-	Y = numpy.array(wordcts,numpy.int32)
-	numpy.save('reviews_cts.npy',Y)
+	# we stream the review texts from the review data (or from its columnar store, see columnar.py) and split them into chunks
+	store = os.path.splitext(reviews)[0] + '_store'
+	if os.path.isdir(store):
+		texts = ReviewStore(store).texts()
+	else:
+		texts = (d['text'] for d in iter_reviews(reviews))
+	chunks = batches(texts, chunk_size)
+
+	# each chunk is normalized by the same token pipeline as the one used to build the dictionary (see Dictionary.py), restricted to the words
+	# in the dictionary, and turned into a sparse matrix of word counts, one row per review (see count_matrix); the chunks are stacked in the order
+	# of the reviews, so that Y is the same for any number of processes
+	with Stage('lda.setting', unit='reviews', n_jobs=n_jobs) as stage:
+		if n_jobs > 1:
+			pool = multiprocessing.Pool(n_jobs, initializer=init_featurize, initargs=(vocab,))
+			try:
+				parts = list(pool.imap(featurize, chunks))
+			finally:
+				pool.close()
+				pool.join()
+		else:
+			init_featurize(vocab)
+			parts = [featurize(texts) for texts in chunks]
+
+		if parts:
+			Y = scipy.sparse.vstack(parts, format='csr')
+		else:
+			Y = scipy.sparse.csr_matrix((0, len(vocab)), dtype='int32')
+		stage.count(Y.shape[0])
+
+	# we save the formatted review data in compressed sparse format; these outputs can be used when implementing the LDA again at a later point in time
+	scipy.sparse.save_npz(output, Y)
 
 	# change back to original directory
 	os.chdir(directory_default)
@@ -68,41 +120,96 @@ def setting():
 # Note: the random_state input specifies the topic prior parameters; we choose the default value of 1; There will be a warning message 
 # saying that some zero rows are found; this can be circumvented by allowing a larger dictionary (1000 words might be a bit too little)
 
-def fit_lda(K,N_iter,Y):
-	""" runs the batch LDA algorithm on Y as above for K topics and N_ter iterations; it outputs topic loadings, topic_word, and 
-	document loadings, doc_topic, as well as merges these loadings with our original Madison review data, and saves them in .json format """
+def fit_lda(K,N_iter,Y,n_chains=1,n_jobs=1,combine='best',distributed=False,sync_every=10,refresh=10,random_state=1):
+	""" runs the batch LDA algorithm on Y as above (a sparse or dense count matrix) for K topics and N_ter iterations; it outputs topic loadings, topic_word, and 
+	document loadings, doc_topic, as well as merges these loadings with our original Madison review data, and saves them in .json format; n_chains chains are 
+	run on n_jobs processes and the best one is kept (or their aligned topics are averaged if combine is 'average'), or, if distributed is True, a single 
+	chain is run with the reviews split across n_jobs processes that are merged every sync_every iterations (see gibbs.py); random_state is the seed of the 
+	sampler (of the first chain) """
 
 	# we load required packages
-	import os, json, string, re, numpy, lda
-	import matplotlib.pyplot as plt
+	import os, json, numpy, lda
+	from reviews import iter_reviews
+	from columnar import ReviewStore
+	from gibbs import fit_chains, fit_distributed
+	from instrument import Stage, GibbsProgress
 
 	# change working directory
 	directory_default = os.getcwd()
-	user = os.environ['HOME']
-	directory = user  + '/Dropbox/REVIEWS_CODES/Final_Code/Yelp_Data_Set/Data_Sets_Madison'
+	from context import get_context
+	directory = get_context().directory
 	os.chdir(directory)
 
-		# load the review data and dictionary
-	with open('reviews_Madison.json') as fp: 
-		Madison = json.load(fp)  
-
-	model = lda.LDA(n_topics=K,n_iter=N_iter,random_state=1)
-	model.fit(Y)
+	# the log likelihoods of the sampler are reported while it runs (see instrument.py); refresh is the number of iterations between two reports
+	with Stage('lda.fit', unit='documents', items=Y.shape[0], K=K, N_iter=N_iter, n_chains=n_chains, n_jobs=n_jobs, distributed=distributed):
+		if distributed:
+			topic_word, doc_topic, loglikelihoods = fit_distributed(Y, K, N_iter, n_jobs, sync_every, seed=random_state)
+		elif n_chains > 1:
+			topic_word, doc_topic, loglikelihoods = fit_chains(Y, K, N_iter, n_chains, n_jobs, combine, seed=random_state)
+		else:
+			with GibbsProgress('lda.fit'):
+				model = lda.LDA(n_topics=K,n_iter=N_iter,random_state=random_state,refresh=refresh)
+				model.fit(Y)
+			topic_word = model.topic_word_
+			doc_topic = model.doc_topic_
 
 	# we save the LDA topic and document loadings
-	topic_word = model.topic_word_
-	doc_topic = model.doc_topic_
 	numpy.save('topic_word.npy',topic_word)
 	numpy.save('doc_topic.npy',doc_topic)
 
-	# we attach the LDA results to the review data and save the output
-	for i in range(0,len(Madison)):
-		Madison[i]['loading'] = list(doc_topic[i])
+	# we attach the LDA results to the review data and save the output; the reviews are streamed from the review data (or from its columnar store,
+	# see columnar.py, which also keeps the loadings) rather than loaded at once
+	if os.path.isdir('reviews_Madison_store'):
+		store = ReviewStore('reviews_Madison_store')
+		numpy.save(os.path.join(store.directory, 'doc_topic.npy'), numpy.asarray(doc_topic, dtype=numpy.float64))
+		Madison = store.reviews()
+	else:
+		Madison = iter_reviews('reviews_Madison.json')
 
 	with open('reviews_Madison_extended.json', 'w') as outfile:
-		json.dump(Madison, outfile)
+		outfile.write('[')
+		for i, review in enumerate(Madison):
+			review['loading'] = list(map(float, doc_topic[i]))
+			outfile.write((', ' if i else '') + json.dumps(review))
+		outfile.write(']')
 
 	# change back to original directory
 	os.chdir(directory_default)
 
+# alternatively, the topics can be computed with the online variational algorithm of HoffmanBleiBach2010b.pdf (see onlinelda.py); the state of the
+# model is stored in online_lda.npz, so that each call only processes the reviews in Y (e.g. the reviews that arrived since the last call, as 
+# computed by setting(reviews=..., output=...)) rather than the whole data set
+
+def fit_online(Y, K=None, batch_size=256, state='online_lda.npz'):
+	""" updates the online LDA model stored in state with the reviews in Y in mini-batches of batch_size reviews; if there is no saved model 
+	yet, a new model with K topics is created; saves the updated model and its topic loadings, topic_word_online.npy, and returns the document
+	loadings doc_topic of the reviews in Y """
+
+	# we load required packages
+	import os, numpy
+	from onlinelda import OnlineLDA
+
+	# change working directory
+	directory_default = os.getcwd()
+	from context import get_context
+	directory = get_context().directory
+	os.chdir(directory)
+
+	if os.path.exists(state):
+		model = OnlineLDA.load(state)
+	elif K is None:
+		os.chdir(directory_default)
+		raise ValueError('there is no saved model {}; the number of topics K is required to create a new model'.format(state))
+	else:
+		model = OnlineLDA(K, Y.shape[1])
+
+	doc_topic = model.partial_fit(Y, batch_size)
+
+	# we save the state of the model and its topic loadings
+	model.save(state)
+	numpy.save('topic_word_online.npy', model.topic_word)
+
+	# change back to original directory
+	os.chdir(directory_default)
 
+	return doc_topic
@@ -10,63 +10,55 @@
 # which contains the profiles of these costumers is called 'piglets.json'
 
 # we load required packages
-import os, json, string, re, sys
-import matplotlib.pyplot as plt
+import os, json, sys
 import numpy as np
-
-def main():
-	"""
-	Computes the training data set for the Madison cohort as specified by up to two dates and stores
-	the outputs as .json files in the Data_Sets_Madison folder
-	"""
-	# change working directory
-	directory_default = os.getcwd()
-	user = os.environ['HOME']
-	directory = user  + '/Dropbox/REVIEWS_CODES/Final_Code/Yelp_Data_Set/Data_Sets_Madison'
-	os.chdir(directory)
-
-	# we load the relevant functions from the auxillary.py file
-	from auxillary import display_profile
-
-	# load the review data and dictionary
-	with open('reviews_Madison_extended.json') as fp: 
-		Madison = json.load(fp)   
-
-	# load topic and document distributions from LDA analysis
-	topic_word = np.load("topic_word.npy")
-	doc_topic = np.load("doc_topic.npy")
-
-	# we compute a list of all review dates	
-	dates = [Madison[i]['date'] for i in range(0,len(Madison))]
-
-	# we specify start and end dates
-	if (len(sys.argv) == 1):
-		time_start =  min(dates)
-		time_end = max(dates)
-	elif (len(sys.argv) == 2):
-		time_start = min(dates)
-		time_end = sys.argv[1]
-	elif (len(sys.argv) == 3):
-			time_start = sys.argv[1]
-			time_end = sys.argv[2]
-
-	# we compute the indicies of the reviews that fall between our start and end times and the indices of reviews after the interval
-	index_training = [i for i in range(0,len(Madison)) if Madison[i]['date'] > time_start and Madison[i]['date'] < time_end]
-	index_test = [i for i in range(0,len(Madison)) if Madison[i]['date'] > time_end]
-
-	# we compute training and test reviews and store them in the Data_Sets_Madison folder
+from profiles import group_rows, mean_profiles
+from context import get_context
+from columnar import field
+from instrument import Stage
+
+def load_date_index(dates, path='date_index.npz'):
+	""" loads the index of the reviews by date (see dates.py), where dates are the dates of the reviews, from path; if there is no such index yet (or
+	it belongs to a different data set, i.e. the hash of its dates differs), the index is computed and saved """
+	from dates import DateIndex, dates_digest
+	if os.path.exists(path):
+		date_index = DateIndex.load(path)
+		if len(date_index) == len(dates) and date_index.key == dates_digest(dates):
+			return date_index
+	date_index = DateIndex.build(dates)
+	date_index.save(path)
+	return date_index
+
+def split(date_index, time_start, time_end, test_end=None):
+	""" indices of the reviews posted between time_start and time_end (training set), and of the reviews posted after time_end (test set; if test_end
+	is specified, only the reviews posted before test_end), in the order of the reviews; both are found by binary search in the date index """
+	if test_end is None:
+		index_test = date_index.after(time_end)
+	else:
+		index_test = date_index.between(time_end, test_end)
+	return np.sort(date_index.between(time_start, time_end)), np.sort(index_test)
+
+def build_profiles(Madison, doc_topic, index_training, index_test):
+	""" computes the costumer and business profiles of the training set and the piglets of the test set, where index_training and index_test are the 
+	indices of the reviews in Madison that belong to the training and test sets, respectively, and doc_topic are the topic loadings of the reviews in
+	Madison; returns the lists of costumer profiles, business profiles and piglets """
 	Madison_training = [Madison[i] for i in index_training]
-	with open('reviews_Madison_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
-		json.dump(Madison_training, outfile)
 	Madison_test = [Madison[i] for i in index_test]
-	with open('reviews_Madison_test' + '_' + time_end + '_' + max(dates) + '.json', 'w') as outfile:
-		json.dump(Madison_test, outfile)
 
-	# we compute the costumer ids for all reviews in the training set and store then in the same folder
+	# we compute the costumer ids for all reviews in the training set
 	costumer_ids = [Madison_training[i]['user_id'] for i in range(0,len(Madison_training))]
 	costumer_ids = list(set(costumer_ids))
-	with open('costumer_ids_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
-		json.dump(costumer_ids, outfile)
+
+	# we group the reviews of the training set, the test set and the whole data set by costumer and business (in a single pass over each set); 
+	# each group is the list of the indices of the reviews, in the order of the set
+	training_by_costumer = group_rows([Madison_training[i]['user_id'] for i in range(0,len(Madison_training))])
+	training_by_business = group_rows([Madison_training[i]['business_id'] for i in range(0,len(Madison_training))])
+	test_by_costumer = group_rows([Madison_test[i]['user_id'] for i in range(0,len(Madison_test))])
+	all_by_costumer = group_rows(field(Madison, 'user_id'))
+
+	# the topic distribution of a costumer is the mean of the topic loadings of all of his/her reviews in the data set (see auxillary.profiles_for),
+	# computed for all costumers at once
+	dists = mean_profiles([all_by_costumer[id] for id in costumer_ids], doc_topic)
 
 	# we compute costumer profiles for each costumer that makes an occurences in our time interval; a costumer profile consists of
 	# its (yelp) user id, a list of all ids of reviews from this particular costumer, the ids of all businesses he/she has reviewed
@@ -75,22 +67,18 @@ def main():
 	for i in range(0,len(costumer_ids)):
 		costumer_profile = {}
 		costumer_profile['id'] = costumer_ids[i]
-		review_ids = [Madison_training[i]['review_id'] for i in range(0,len(Madison_training)) if Madison_training[i]['user_id'] == costumer_profile['id']]
-		business_ids = [Madison_training[i]['business_id'] for i in range(0,len(Madison_training)) if Madison_training[i]['user_id'] == costumer_profile['id']]
+		rows = training_by_costumer[costumer_profile['id']]
+		review_ids = [Madison_training[j]['review_id'] for j in rows]
+		business_ids = [Madison_training[j]['business_id'] for j in rows]
 		costumer_profile['businesses'] = list(set(business_ids))
 		costumer_profile['no.reviews'] = len(review_ids)
 		costumer_profile['review_ids'] = review_ids
-		costumer_profile['dist'] = display_profile(costumer_profile['id'],display=None)
+		costumer_profile['dist'] = dists[i].tolist()
 		costumer_profiles.append(costumer_profile) 
 
-	with open('costumer_profiles_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
-		json.dump(costumer_profiles, outfile)
-
-	# we compute business ids for all reviews in the training set and store them in the same folder; 
+	# we compute business ids for all reviews in the training set
 	business_ids = [Madison_training[i]['business_id'] for i in range(0,len(Madison_training))]
 	business_ids = list(set(business_ids))
-	with open('business_ids_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
-		json.dump(business_ids, outfile)
 
 	# we compute business profiles for each business that is reviewed in our time interval; a business profile consists of 
 	# its (yelp) business id, a list of all ids and indices of costumers that reviewed it in our time frame, the number and ids of such reviews
@@ -99,20 +87,18 @@ def main():
 	for i in range(0,len(business_ids)):
 		business_profile = {}
 		business_profile['id'] = business_ids[i]
-		review_ids = [Madison_training[i]['review_id'] for i in range(0,len(Madison_training)) if Madison_training[i]['business_id'] == business_profile['id']]
-		review_ratings = [Madison_training[i]['stars'] for i in range(0,len(Madison_training)) if Madison_training[i]['business_id'] == business_profile['id']]
+		rows = training_by_business[business_profile['id']]
+		review_ids = [Madison_training[j]['review_id'] for j in rows]
+		review_ratings = [Madison_training[j]['stars'] for j in rows]
 		business_profile['no_reviews'] = len(review_ids)
 		business_profile['review_ids'] = review_ids
 		business_profile['rating'] = sum(review_ratings) / float(len(review_ids))
-		costumers = [Madison_training[i]['user_id'] for i in range(0,len(Madison_training)) if Madison_training[i]['business_id'] == business_profile['id']]
+		costumers = [Madison_training[j]['user_id'] for j in rows]
 		# business_profile['costumer_indices'] = [i for i in range(0,len(costumer_profiles)) if business_profile['id'] in costumer_profiles[i]['businesses']]
 		costumers = list(set(costumers))
 		business_profile['costumer_ids'] = costumers
 		business_profiles.append(business_profile)
 
-	with open('business_profiles_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
-		json.dump(business_profiles, outfile)
-
 	# we now compute a list of high-activity costumers during the testing period; these will be referred to as piglets and include all indivuals who posted at least
 	# 15 reviews in the training period;  a piglet is classified by its costumer id, the number of its total reviews in the training and test intervals, a list of 
 	# ids from all business he/she reviewed during testing, as well as the rating he gave in these reviews
@@ -122,14 +108,79 @@ def main():
 	for i in range(0,len(costumer_ids_test)):
 		piglet = {}
 		piglet['id'] = costumer_ids_test[i]
-		piglet['total_test_reviews'] = len([Madison_test[i]['review_id'] for i in range(0,len(Madison_test)) if Madison_test[i]['user_id'] == piglet['id']])
-		piglet['total_training_reviews'] = len([Madison_training[i]['review_id'] for i in range(0,len(Madison_training)) if Madison_training[i]['user_id'] == piglet['id']])
-		piglet['test_restaurants'] = [Madison_test[i]['business_id'] for i in range(0,len(Madison_test)) if Madison_test[i]['user_id'] == piglet['id']]
-		piglet['test_restaurants_rating'] = [Madison_test[i]['stars'] for i in range(0,len(Madison_test)) if Madison_test[i]['user_id'] == piglet['id']]
+		rows = test_by_costumer[piglet['id']]
+		piglet['total_test_reviews'] = len(rows)
+		piglet['total_training_reviews'] = len(training_by_costumer.get(piglet['id'], []))
+		piglet['test_restaurants'] = [Madison_test[j]['business_id'] for j in rows]
+		piglet['test_restaurants_rating'] = [Madison_test[j]['stars'] for j in rows]
 		if piglet['total_training_reviews'] > 15:
 			piglets.append(piglet)
 
-	with open('piglets' + '_' + time_end + '_' + max(dates) + '.json', 'w') as outfile:
+	return costumer_profiles, business_profiles, piglets
+
+def main(time_start=None, time_end=None):
+	"""
+	Computes the training data set for the Madison cohort as specified by up to two dates and stores
+	the outputs as .json files in the Data_Sets_Madison folder; the dates are taken from the command line unless they are given
+	"""
+	# change working directory
+	directory_default = os.getcwd()
+	context = get_context()
+	os.chdir(context.directory)
+
+	# the review data and the document distributions from LDA analysis
+	Madison = context.Madison
+	doc_topic = context.doc_topic
+
+	# we load (or compute) the index of the reviews by date
+	date_index = load_date_index(field(Madison, 'date'))
+
+	# we specify start and end dates
+	if time_end is not None:
+		time_start = time_start or date_index.first()
+	elif (len(sys.argv) == 1):
+		time_start =  date_index.first()
+		time_end = date_index.last()
+	elif (len(sys.argv) == 2):
+		time_start = date_index.first()
+		time_end = sys.argv[1]
+	elif (len(sys.argv) == 3):
+			time_start = sys.argv[1]
+			time_end = sys.argv[2]
+
+	# we compute the indicies of the reviews that fall between our start and end times and the indices of reviews after the interval
+	with Stage('profiles.split', unit='reviews', items=len(Madison), time_start=time_start, time_end=time_end):
+		index_training, index_test = split(date_index, time_start, time_end)
+
+	# we compute training and test reviews and store them in the Data_Sets_Madison folder
+	with Stage('profiles.write_sets', unit='reviews', items=len(index_training) + len(index_test)):
+		Madison_training = [Madison[i] for i in index_training]
+		with open('reviews_Madison_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
+			json.dump(Madison_training, outfile)
+		Madison_test = [Madison[i] for i in index_test]
+		with open('reviews_Madison_test' + '_' + time_end + '_' + date_index.last() + '.json', 'w') as outfile:
+			json.dump(Madison_test, outfile)
+
+	# we compute the costumer and business profiles as well as the piglets and store them in the same folder, together with the costumer and business ids
+	with Stage('profiles.build', unit='reviews', items=len(index_training) + len(index_test)) as stage:
+		costumer_profiles, business_profiles, piglets = build_profiles(Madison, doc_topic, index_training, index_test)
+		stage.fields.update(costumers=len(costumer_profiles), businesses=len(business_profiles), piglets=len(piglets))
+
+	costumer_ids = [costumer_profile['id'] for costumer_profile in costumer_profiles]
+	with open('costumer_ids_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
+		json.dump(costumer_ids, outfile)
+
+	with open('costumer_profiles_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
+		json.dump(costumer_profiles, outfile)
+
+	business_ids = [business_profile['id'] for business_profile in business_profiles]
+	with open('business_ids_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
+		json.dump(business_ids, outfile)
+
+	with open('business_profiles_training' + '_' + time_start + '_' + time_end + '.json', 'w') as outfile:
+		json.dump(business_profiles, outfile)
+
+	with open('piglets' + '_' + time_end + '_' + date_index.last() + '.json', 'w') as outfile:
 		json.dump(piglets, outfile)
 
 	# change back to default directory
@@ -0,0 +1,57 @@
+# This file implements a small cache for intermediate results (artifacts) of the pipeline; each artifact is stored in a folder named after a hash of
+# everything it was computed from (the contents of its input files and its parameters), so that an artifact only has to be recomputed if one of its
+# inputs or parameters changed.
+
+# we load required packages
+import os, json, hashlib
+
+def digest(*parts):
+	""" hash of the (json serializable) parts """
+	return hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf8')).hexdigest()
+
+def file_digest(path, chunk_size=1 << 20):
+	""" hash of the contents of the file at path """
+	h = hashlib.sha1()
+	with open(path, 'rb') as fp:
+		while True:
+			chunk = fp.read(chunk_size)
+			if not chunk:
+				break
+			h.update(chunk)
+	return h.hexdigest()
+
+class ArtifactCache:
+	def __init__(self, directory):
+		""" the artifacts are stored in the folder directory """
+		self.directory = directory
+
+	def path(self, key, name=None):
+		""" the folder of the artifact with hash key, or the file name in this folder """
+		if name is None:
+			return os.path.join(self.directory, key)
+		return os.path.join(self.directory, key, name)
+
+	def has(self, key):
+		""" whether the artifact with hash key has been stored completely """
+		return os.path.exists(self.path(key, '.complete'))
+
+	def open(self, key):
+		""" creates the folder of the artifact with hash key and returns its path """
+		folder = self.path(key)
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+		return folder
+
+	def commit(self, key):
+		""" marks the artifact with hash key as completely stored """
+		with open(self.path(key, '.complete'), 'w') as fp:
+			fp.write(key)
+
+	def load_json(self, key, name):
+		with open(self.path(key, name)) as fp:
+			return json.load(fp)
+
+	def save_json(self, key, name, obj):
+		self.open(key)
+		with open(self.path(key, name), 'w') as fp:
+			json.dump(obj, fp)
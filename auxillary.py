@@ -2,39 +2,50 @@
 # TrainingTestSet.py). 
 
 # we load required packages
-import os, json, string, re
-import matplotlib.pyplot as plt
 import numpy as np
+from profiles import UserIndex, recency_weights
+from columnar import field
+from context import get_context
 
-# change working directory
-directory_default = os.getcwd()
-user = os.environ['HOME']
-directory = user  + '/Dropbox/REVIEWS_CODES/Final_Code/Yelp_Data_Set/Data_Sets_Madison'
-os.chdir(directory)
+# the review data, dictionary and topic and document distributions from the LDA analysis are loaded from the data folder the first time they are used
+# (see context.py)
 
-# load the review data and dictionary
-with open('reviews_Madison_extended.json') as fp: 
-	Madison = json.load(fp)   
-
-with open('dictionary.txt') as f:
-	vocab = [line.rstrip('\n') for line in f]
-
-# load topic and document distributions from LDA analysis
-topic_word = np.load("topic_word.npy")
-doc_topic = np.load("doc_topic.npy")
-
- # we implement a few functions to visualize the results of the LDA
+# we implement a few functions to visualize the results of the LDA
 def display_topic(n,m):
 	""" displays the top m words (by probability) of topic n """
+	vocab = get_context().vocab
+	topic_word = get_context().topic_word
 	topic_words = np.array(vocab)[np.argsort(topic_word[n])][:-(m+1):-1]
 	topic_words_prob = topic_word[n][np.argsort(topic_word[n])[:-(m+1):-1]]
-	topic_words_prob = [round(x,3) for x in topic_words_prob]
-	print('TOPIC {}: {} '.format(n, zip(topic_words, topic_words_prob)))
+	topic_words_prob = [round(float(x),3) for x in topic_words_prob]
+	print('TOPIC {}: {} '.format(n, list(zip(topic_words.tolist(), topic_words_prob))))
+
+def user_index():
+	""" the index of the reviews in Madison by costumer (see profiles.UserIndex), which is computed once """
+	context = get_context()
+	return context.cached('user_index', lambda: UserIndex(field(context.Madison, 'user_id')))
+
+def profiles_for(user_ids, half_life=None):
+	""" returns the (number of user_ids x K) array of the topic distributions of the costumers user_ids, i.e. the mean of the document distributions of
+	all reviews each costumer has written; if half_life is given, the reviews are weighted by 0.5**(age/half_life), where age is the number of days
+	the review was written before the last review in the data set. The distributions of all costumers are computed on the first call and then cached """
+	context = get_context()
+	index = user_index()
+	def load():
+		weights = None
+		if half_life is not None:
+			weights = recency_weights(field(context.Madison, 'date'), half_life)
+		return index.profiles(context.doc_topic, weights)
+	profiles = context.cached(('profiles', half_life), load)
+	return profiles[index.lookup(user_ids)]
 
 def display_topic_dist(n):
 	""" selects the nth costumer and displays the topic probabilities for each of his reviews (five reviews at max) """
+	import matplotlib.pyplot as plt
+	Madison = get_context().Madison
+	doc_topic = get_context().doc_topic
 	id= Madison[n]['user_id']
-	set = [i for i in range(0,len(Madison)) if Madison[i]['user_id']==id]
+	set = user_index().rows(id).tolist()
 	set = set[0:min(len(set),5)]
 	f, ax= plt.subplots(len(set), 1, figsize=(8, 6), sharex=True)
 	for i, k in enumerate(set):
@@ -48,18 +59,15 @@ def display_topic_dist(n):
 	plt.tight_layout()
 	plt.show()
 
-def display_profile(id,display=None):
-	""" creates the topic distribution for a given costumer id (i.e. sum of all document distributions for each review the costumer has written, normalized);
-		if display is set to True, a bar plot will be returned which displays the distribution """
-	index = [i for i in range(0,len(Madison)) if Madison[i]['user_id']==id]
-	profile = Madison[index[0]]['loading']
-	for i in range(1,len(index)):
-		profile = [sum(x) for x in zip(profile, Madison[index[i]]['loading'])]
-		profile = [x / float(len(index)) for x in profile]
+def display_profile(id,display=None,half_life=None):
+	""" creates the topic distribution for a given costumer id (i.e. mean of all document distributions for each review the costumer has written, see
+		profiles_for); if display is set to True, a bar plot will be returned which displays the distribution """
+	profile = profiles_for([id], half_life)[0].tolist()
 	if display is True:
+		import matplotlib.pyplot as plt
 		plt.bar(range(0,len(profile)),profile)
 		plt.xlabel("Topic")
 		plt.ylabel("Frequency")
 		plt.show()
 	else: 
-		return profile
\ No newline at end of file
+		return profile
@@ -0,0 +1,90 @@
+# This file evaluates our prediction method over several training/test splits (a rolling-origin backtest): for each cutoff date, the training set
+# consists of the reviews from the start date up to the cutoff, and the test set of the reviews after the cutoff (up to horizon days after it, if a
+# horizon is given). For each window the profiles and piglets are computed as in TrainingTestSet.py, and the prediction error is reported next to the
+# error of simply taking the average rating of a business, for each power p. The profiles of a window are cached in the backtest_cache folder under a
+# hash of the review data, the LDA loadings and the dates of the window, so that they are only recomputed if one of these changes (and not e.g. when
+# only p changes). The results are written to backtest_results.csv in the cache folder.
+
+# the script is run using the command
+#	python backtest.py 2011-07-16 2012-07-16 2013-07-16 --p 1 2 --horizon 365
+
+# we load required packages
+import os, csv, argparse, datetime
+import numpy as np
+from artifacts import ArtifactCache, digest, file_digest
+from TrainingTestSet import load_date_index, split, build_profiles
+from profiles import ProfileStore
+from ratings import RatingIndex
+from evaluation import evaluate
+from context import get_context
+from columnar import field
+
+# version of the code that computes the profiles of a window; changing it invalidates the cached profiles (2: the costumer profiles are the means
+# of the loadings of all of their reviews, see profiles.mean_profiles)
+VERSION = 2
+
+def add_days(date, days):
+	""" the date days days after date (in the format '2011-01-01') """
+	return (datetime.datetime.strptime(date[:10], '%Y-%m-%d') + datetime.timedelta(days=days)).strftime('%Y-%m-%d')
+
+def window_profiles(cache, key, Madison, doc_topic, date_index, time_start, time_end, test_end):
+	""" the costumer and business profiles, the piglets and the indices of the training reviews of a window; these are loaded from the cache
+	if they have been computed before """
+	if not cache.has(key):
+		index_training, index_test = split(date_index, time_start, time_end, test_end)
+		costumer_profiles, business_profiles, piglets = build_profiles(Madison, doc_topic, index_training, index_test)
+		cache.save_json(key, 'profiles.json', {'costumer_profiles': costumer_profiles, 'business_profiles': business_profiles, 'piglets': piglets})
+		np.save(cache.path(key, 'index_training.npy'), index_training)
+		cache.commit(key)
+	profiles = cache.load_json(key, 'profiles.json')
+	index_training = np.load(cache.path(key, 'index_training.npy'))
+	return profiles['costumer_profiles'], profiles['business_profiles'], profiles['piglets'], index_training
+
+def backtest(cutoffs, ps=(1,), time_start=None, horizon=None, cache='backtest_cache'):
+	""" evaluates our prediction method for each cutoff date in cutoffs and each power in ps; the training sets start at time_start (the date of
+	the first review by default) and the test sets end horizon days after the cutoff (or at the last review if horizon is None); returns the rows
+	of the results table """
+	context = get_context()
+	directory = context.directory
+	cache = ArtifactCache(os.path.join(directory, cache))
+
+	# the review data and the document loadings of the LDA
+	Madison = context.Madison
+	doc_topic = context.doc_topic
+	date_index = load_date_index(field(Madison, 'date'), os.path.join(directory, 'date_index.npz'))
+	if time_start is None:
+		time_start = date_index.first()
+
+	# the windows depend on the contents of these files
+	data = digest(file_digest(os.path.join(directory, 'reviews_Madison_extended.json')), file_digest(os.path.join(directory, 'doc_topic.npy')))
+
+	rows = []
+	for cutoff in sorted(cutoffs):
+		test_end = add_days(cutoff, horizon) if horizon is not None else None
+		key = digest('backtest', VERSION, data, time_start, cutoff, test_end)
+		costumer_profiles, business_profiles, piglets, index_training = window_profiles(cache, key, Madison, doc_topic, date_index, time_start, cutoff, test_end)
+		store = ProfileStore(costumer_profiles, business_profiles)
+		index = RatingIndex([Madison[i] for i in index_training], store)
+		for p in ps:
+			s_prediction, s_average, n = evaluate(piglets, store, index, p)
+			rows.append([cutoff, test_end or date_index.last(), p, n, s_prediction, s_average, s_average - s_prediction])
+
+	with open(cache.path('backtest_results.csv'), 'w') as fp:
+		writer = csv.writer(fp)
+		writer.writerow(['cutoff', 'test_end', 'p', 'N', 'prediction_error', 'average_error', 'improvement'])
+		for row in rows:
+			writer.writerow(row)
+
+	return rows
+
+def main():
+	parser = argparse.ArgumentParser(description='rolling-origin backtest of the predictions')
+	parser.add_argument('cutoffs', nargs='+')
+	parser.add_argument('--p', type=float, nargs='+', default=[1.])
+	parser.add_argument('--start', default=None)
+	parser.add_argument('--horizon', type=int, default=None)
+	args = parser.parse_args()
+	for row in backtest(args.cutoffs, args.p, args.start, args.horizon):
+		print('{} to {}, p = {}: N = {}, prediction error {:.4f}, average error {:.4f}'.format(*row[:6]))
+
+if __name__ == '__main__':	main()
@@ -0,0 +1,133 @@
+# This file times every stage of the pipeline on synthetic review data (see synthetic.py) at several scales: building the dictionary (Dictionary.py), the
+# bag of words representation (LDA.setting), the LDA (LDA.fit_lda), the training set and profiles (TrainingTestSet.py) and the evaluation of the
+# predictions (predictor.py, see evaluation.py). Each stage runs in a process of its own on the data folder of its scale, so that its peak memory (the
+# maximum resident set size of the process) is measured separately; the wall time and peak memory of each stage are appended as one JSON line to
+# benchmark_results.jsonl in the output folder, together with the scale, the parameters and the current git commit, and compared with the previous
+# result for the same stage, scale and parameters. The synthetic data of a scale is only generated once.
+
+# the benchmark is run using the command
+#	python benchmark.py --scales 10000 100000 1000000 --K 20 --N_iter 100
+
+# we load required packages
+import os, sys, json, time, argparse, subprocess, datetime
+from instrument import peak_rss
+
+STAGES = ['generate', 'dictionary', 'setting', 'fit_lda', 'profiles', 'predictor']
+
+# the synthetic reviews are dated from 2005-01-01 to 2014-12-31; the training sets end at cutoff, and their test sets contain the later reviews
+TIME_START = '2004-12-31'
+CUTOFF = '2013-12-31'
+
+def run_stage(stage, directory, n_reviews, params):
+	""" runs stage on the data in directory (in this process) """
+	import logging
+	logging.disable(logging.WARNING)
+	from context import set_directory
+	context = set_directory(directory)
+	if stage == 'generate':
+		from synthetic import write
+		write(os.path.join(directory, 'reviews_Madison.json'), n_reviews, seed=params['seed'])
+	elif stage == 'dictionary':
+		import Dictionary
+		Dictionary.main(params['vocab_size'])
+	elif stage == 'setting':
+		import LDA
+		LDA.setting(n_jobs=params['n_jobs'])
+	elif stage == 'fit_lda':
+		import LDA
+		LDA.fit_lda(params['K'], params['N_iter'], LDA.load_counts())
+	elif stage == 'profiles':
+		import TrainingTestSet
+		TrainingTestSet.main(TIME_START, CUTOFF)
+	elif stage == 'predictor':
+		from dates import DateIndex
+		from evaluation import evaluate
+		window = context.window(TIME_START, CUTOFF, DateIndex.load(context.path('date_index.npz')).last())
+		evaluate(window.piglets, window.store, window.index, params['p'])
+	else:
+		raise ValueError('unknown stage {}'.format(stage))
+
+def measure(stage, directory, n_reviews, params):
+	""" runs stage in a new process and returns its wall time (in seconds) and peak memory (in MB) """
+	command = [sys.executable, os.path.abspath(__file__), '--run-stage', stage, '--directory', directory, '--reviews', str(n_reviews),
+		'--params', json.dumps(params)]
+	output = subprocess.check_output(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+	result = json.loads(output.decode('utf8').strip().split('\n')[-1])
+	return result['wall_s'], result['peak_rss_mb']
+
+def git_commit():
+	""" the current git commit of the code, if known """
+	try:
+		return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+			stderr=subprocess.STDOUT).decode('utf8').strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def load_results(path):
+	results = []
+	if os.path.exists(path):
+		with open(path) as fp:
+			results = [json.loads(line) for line in fp if line.strip()]
+	return results
+
+def benchmark(scales, stages=STAGES, output='benchmark', params=None):
+	""" runs stages at each scale (number of reviews) in scales, appends the results to benchmark_results.jsonl in the folder output and returns them """
+	params = dict({'seed': 1, 'vocab_size': 1000, 'n_jobs': 1, 'K': 20, 'N_iter': 100, 'p': 1}, **(params or {}))
+	path = os.path.join(output, 'benchmark_results.jsonl')
+	previous = load_results(path)
+	commit = git_commit()
+	results = []
+	for n_reviews in scales:
+		directory = os.path.abspath(os.path.join(output, 'reviews_{}'.format(n_reviews)))
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+		for stage in stages:
+			if stage == 'generate' and os.path.exists(os.path.join(directory, 'reviews_Madison.json')):
+				continue
+			wall, rss = measure(stage, directory, n_reviews, params)
+			result = {'time': datetime.datetime.now().isoformat(), 'commit': commit, 'stage': stage, 'reviews': n_reviews, 'wall_s': wall,
+				'peak_rss_mb': rss, 'reviews_per_s': n_reviews / wall if wall > 0 else None, 'params': params, 'python': sys.version.split()[0]}
+			with open(path, 'a') as fp:
+				fp.write(json.dumps(result, sort_keys=True) + '\n')
+			results.append(result)
+			report(result, previous)
+	return results
+
+def report(result, previous):
+	""" prints result next to the last previous result for the same stage, scale and parameters """
+	same = [r for r in previous if r['stage'] == result['stage'] and r['reviews'] == result['reviews'] and r['params'] == result['params']]
+	line = '{stage:>10} {reviews:>9} reviews: {wall_s:9.2f}s {peak_rss_mb:9.1f}MB'.format(**result)
+	if same:
+		last = same[-1]
+		line = line + '   (previous {:.2f}s {:.1f}MB at {}, x{:.2f} time)'.format(last['wall_s'], last['peak_rss_mb'], last['commit'],
+			result['wall_s'] / last['wall_s'] if last['wall_s'] > 0 else float('nan'))
+	print(line)
+	sys.stdout.flush()
+
+def main():
+	parser = argparse.ArgumentParser(description='timings of the pipeline stages on synthetic data')
+	parser.add_argument('--scales', type=int, nargs='+', default=[10000, 100000, 1000000])
+	parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+	parser.add_argument('--output', default='benchmark')
+	parser.add_argument('--vocab-size', type=int, default=1000)
+	parser.add_argument('--jobs', type=int, default=1)
+	parser.add_argument('--K', type=int, default=20)
+	parser.add_argument('--N_iter', type=int, default=100)
+	parser.add_argument('--p', type=float, default=1)
+	# the options used for running a single stage in its own process (see measure)
+	parser.add_argument('--run-stage', default=None)
+	parser.add_argument('--directory', default=None)
+	parser.add_argument('--reviews', type=int, default=None)
+	parser.add_argument('--params', default=None)
+	args = parser.parse_args()
+
+	if args.run_stage is not None:
+		t = time.time()
+		run_stage(args.run_stage, args.directory, args.reviews, json.loads(args.params))
+		print(json.dumps({'wall_s': time.time() - t, 'peak_rss_mb': peak_rss()}))
+		return
+
+	params = {'vocab_size': args.vocab_size, 'n_jobs': args.jobs, 'K': args.K, 'N_iter': args.N_iter, 'p': args.p}
+	benchmark(args.scales, args.stages, args.output, params)
+
+if __name__ == '__main__':	main()
@@ -0,0 +1,211 @@
+# This file converts the review data (e.g. reviews_Madison.json or reviews_Madison_extended.json) once into a columnar store, i.e. a folder with one file
+# per field of the reviews: the ratings (stars.npy), the dates as integers of the form 20110101 (dates.npy), the user and business ids encoded as
+# integer codes into the lists of distinct ids (user_codes.npy and users.json, business_codes.npy and businesses.json), the review ids (review_ids.json),
+# the review texts as one utf8 encoded byte string together with the offsets of each review (text.bin and text_offsets.npy) and, optionally, the topic
+# loadings of the reviews (doc_topic.npy). The numeric columns and the texts are memory-mapped when the store is opened, so that opening the store is
+# almost free and only the parts of the columns that are used are read from disk.
+#
+# Once converted, the store is used in place of the .json files by all scripts that read the reviews: Dictionary.py and LDA.setting read the ratings
+# and texts, LDA.fit_lda reads the reviews it attaches the topic loadings to, and the data context (see context.py) serves the reviews to
+# TrainingTestSet.py, auxillary.py and backtest.py as a ReviewList, from which whole fields (e.g. the dates or the user ids of all reviews) are read
+# directly from their columns. Only the fields listed above are kept in the store; other fields of the yelp data (e.g. the votes) are dropped.
+
+# the conversion is run using the command
+#	python columnar.py reviews_Madison.json reviews_Madison_store [doc_topic.npy]
+
+# we load required packages
+import os, sys, json
+from array import array
+import numpy as np
+from reviews import iter_reviews
+
+def date_code(date):
+	""" integer code 20110101 of the date '2011-01-01' """
+	return int(date[:10].replace('-', ''))
+
+def date_string(code):
+	""" inverse of date_code """
+	code = int(code)
+	return '{:04d}-{:02d}-{:02d}'.format(code // 10000, (code // 100) % 100, code % 100)
+
+def convert(path, directory, doc_topic=None):
+	""" converts the reviews in the .json file path into a columnar store in the folder directory; doc_topic is an optional array (or .npy file)
+	of the topic loadings of the reviews """
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+	stars = array('b')
+	dates = array('i')
+	user_codes = array('i')
+	business_codes = array('i')
+	offsets = array('q', [0])
+	users = {}
+	businesses = {}
+	review_ids = []
+	with open(os.path.join(directory, 'text.bin'), 'wb') as text:
+		for review in iter_reviews(path):
+			stars.append(int(review['stars']))
+			dates.append(date_code(review['date']))
+			user_codes.append(users.setdefault(review['user_id'], len(users)))
+			business_codes.append(businesses.setdefault(review['business_id'], len(businesses)))
+			review_ids.append(review['review_id'])
+			b = review['text'].encode('utf8')
+			text.write(b)
+			offsets.append(offsets[-1] + len(b))
+
+	np.save(os.path.join(directory, 'stars.npy'), np.array(stars, dtype=np.int8))
+	np.save(os.path.join(directory, 'dates.npy'), np.array(dates, dtype=np.int32))
+	np.save(os.path.join(directory, 'user_codes.npy'), np.array(user_codes, dtype=np.int32))
+	np.save(os.path.join(directory, 'business_codes.npy'), np.array(business_codes, dtype=np.int32))
+	np.save(os.path.join(directory, 'text_offsets.npy'), np.array(offsets, dtype=np.int64))
+	for name, codes in [('users.json', users), ('businesses.json', businesses)]:
+		ids = [None] * len(codes)
+		for id, code in codes.items():
+			ids[code] = id
+		with open(os.path.join(directory, name), 'w') as fp:
+			json.dump(ids, fp)
+	with open(os.path.join(directory, 'review_ids.json'), 'w') as fp:
+		json.dump(review_ids, fp)
+	if doc_topic is not None:
+		if not isinstance(doc_topic, np.ndarray):
+			doc_topic = np.load(doc_topic)
+		np.save(os.path.join(directory, 'doc_topic.npy'), np.asarray(doc_topic, dtype=np.float64))
+
+class ReviewStore:
+	def __init__(self, directory):
+		""" opens the columnar store in the folder directory; nothing is read until a column is used """
+		self.directory = directory
+		self.columns = {}
+
+	def column(self, name):
+		""" the memory-mapped column name (e.g. 'stars', 'dates', 'user_codes', 'business_codes', 'text_offsets' or 'doc_topic') """
+		if name not in self.columns:
+			if name in ('users', 'businesses', 'review_ids'):
+				with open(os.path.join(self.directory, name + '.json')) as fp:
+					self.columns[name] = json.load(fp)
+			elif name == 'text':
+				path = os.path.join(self.directory, 'text.bin')
+				if os.path.getsize(path) == 0:
+					self.columns[name] = np.zeros(0, dtype=np.uint8)
+				else:
+					self.columns[name] = np.memmap(path, dtype=np.uint8, mode='r')
+			else:
+				self.columns[name] = np.load(os.path.join(self.directory, name + '.npy'), mmap_mode='r')
+		return self.columns[name]
+
+	def has(self, name):
+		""" whether the store contains the column name """
+		return os.path.exists(os.path.join(self.directory, name + '.npy'))
+
+	def __len__(self):
+		return len(self.column('stars'))
+
+	@property
+	def stars(self):
+		return self.column('stars')
+
+	@property
+	def dates(self):
+		return self.column('dates')
+
+	@property
+	def user_codes(self):
+		return self.column('user_codes')
+
+	@property
+	def business_codes(self):
+		return self.column('business_codes')
+
+	@property
+	def doc_topic(self):
+		return self.column('doc_topic')
+
+	def field(self, name, rows=None):
+		""" the values of the field name ('review_id', 'user_id', 'business_id', 'stars' or 'date') of the reviews with indices rows (of all reviews
+		if rows is None), read from its column """
+		def take(column):
+			return column if rows is None else np.asarray(column)[rows]
+		if name == 'user_id':
+			return np.array(self.column('users'), dtype=object)[take(self.user_codes)].tolist()
+		elif name == 'business_id':
+			return np.array(self.column('businesses'), dtype=object)[take(self.business_codes)].tolist()
+		elif name == 'date':
+			# there are far fewer distinct dates than reviews
+			codes, inverse = np.unique(take(self.dates), return_inverse=True)
+			return np.array([date_string(code) for code in codes], dtype=object)[inverse].tolist()
+		elif name == 'stars':
+			return take(self.stars).tolist()
+		elif name == 'review_id':
+			return list(take(np.array(self.column('review_ids'), dtype=object)))
+		raise ValueError('the field {} is not stored in a column'.format(name))
+
+	def text(self, i):
+		""" the text of review i """
+		offsets = self.column('text_offsets')
+		return self.column('text')[offsets[i]:offsets[i+1]].tobytes().decode('utf8')
+
+	def texts(self):
+		""" yields the texts of all reviews """
+		for i in range(0,len(self)):
+			yield self.text(i)
+
+	def review(self, i, fields=('review_id', 'user_id', 'business_id', 'stars', 'date', 'text')):
+		""" review i as a dictionary with the given fields, as in the original .json file """
+		review = {}
+		for field in fields:
+			if field == 'review_id':
+				review[field] = self.column('review_ids')[i]
+			elif field == 'user_id':
+				review[field] = self.column('users')[self.user_codes[i]]
+			elif field == 'business_id':
+				review[field] = self.column('businesses')[self.business_codes[i]]
+			elif field == 'stars':
+				review[field] = int(self.stars[i])
+			elif field == 'date':
+				review[field] = date_string(self.dates[i])
+			elif field == 'text':
+				review[field] = self.text(i)
+			elif field == 'loading':
+				review[field] = self.doc_topic[i].tolist()
+		return review
+
+	def reviews(self, fields=('review_id', 'user_id', 'business_id', 'stars', 'date', 'text')):
+		""" yields all reviews as dictionaries with the given fields """
+		for i in range(0,len(self)):
+			yield self.review(i, fields)
+
+class ReviewList:
+	def __init__(self, store, doc_topic=None):
+		""" read-only list of the reviews in the columnar store, each as a dictionary with the fields of reviews_Madison_extended.json (the topic
+		loadings are taken from doc_topic if given, and from the doc_topic column of the store otherwise) """
+		self.store = store
+		self.doc_topic = doc_topic if doc_topic is not None else store.doc_topic
+		self.fields = ('review_id', 'user_id', 'business_id', 'stars', 'date', 'text')
+
+	def __len__(self):
+		return len(self.store)
+
+	def __getitem__(self, i):
+		review = self.store.review(i, self.fields)
+		review['loading'] = self.doc_topic[i].tolist()
+		return review
+
+	def __iter__(self):
+		for i in range(0,len(self)):
+			yield self[i]
+
+	def field(self, name):
+		""" the values of the field name of all reviews, read from its column if there is one """
+		if name in ('review_id', 'user_id', 'business_id', 'stars', 'date'):
+			return self.store.field(name)
+		return [self[i][name] for i in range(0,len(self))]
+
+def field(reviews, name):
+	""" the values of the field name of all reviews in the list reviews (a list of dictionaries or a ReviewList) """
+	if isinstance(reviews, ReviewList):
+		return reviews.field(name)
+	return [review[name] for review in reviews]
+
+def main():
+	convert(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+
+if __name__ == '__main__':	main()
@@ -0,0 +1,191 @@
+# This file implements the data context shared by the modules of this project: it knows the folder the data sets are stored in (the Data_Sets_Madison
+# folder in Dropbox by default; a different folder can be set with the environment variable YELP_DATA_DIR or with set_directory) and loads the data sets
+# lazily, i.e. a file is only read the first time it is used, and then kept in memory, so that each file is read at most once per process no matter
+# how many modules use it. The context of the training set of a time interval (its reviews, profiles, rating index and piglets, see predictor.py) is
+# available in the same way through window().
+
+# usage:
+#	from context import get_context
+#	doc_topic = get_context().doc_topic
+
+# we load required packages
+import os, json
+import numpy as np
+
+def default_directory():
+	""" the folder the data sets are stored in, unless specified otherwise """
+	if os.environ.get('YELP_DATA_DIR'):
+		return os.environ['YELP_DATA_DIR']
+	user = os.environ['HOME']
+	return user  + '/Dropbox/REVIEWS_CODES/Final_Code/Yelp_Data_Set/Data_Sets_Madison'
+
+class DataContext:
+	def __init__(self, directory=None):
+		self.directory = directory if directory is not None else default_directory()
+		self.cache = {}
+
+	def path(self, name):
+		""" path of the file name in the data folder """
+		return os.path.join(self.directory, name)
+
+	def cached(self, key, load):
+		""" the result of load(), which is only computed the first time key is requested """
+		if key not in self.cache:
+			self.cache[key] = load()
+		return self.cache[key]
+
+	def load_json(self, name):
+		""" contents of the .json file name """
+		def load():
+			with open(self.path(name)) as fp:
+				return json.load(fp)
+		return self.cached(name, load)
+
+	def load_npy(self, name):
+		""" contents of the .npy file name """
+		return self.cached(name, lambda: np.load(self.path(name)))
+
+	@property
+	def Madison(self):
+		""" the Madison review data including the topic loadings of each review; if the review data has been converted to a columnar store (see
+		columnar.py), the reviews are read from the store, otherwise from reviews_Madison_extended.json """
+		def load():
+			from columnar import ReviewList
+			store = self.review_store
+			if store is None:
+				return None
+			# the topic loadings are taken from the store if LDA.fit_lda has saved them there, and from doc_topic.npy otherwise
+			doc_topic = None if store.has('doc_topic') else self.doc_topic
+			if len(doc_topic if doc_topic is not None else store.doc_topic) != len(store):
+				return None
+			return ReviewList(store, doc_topic)
+		reviews = self.cached('reviews_Madison_store', load)
+		if reviews is None:
+			return self.load_json('reviews_Madison_extended.json')
+		return reviews
+
+	@property
+	def review_store(self):
+		""" the columnar store of the review data (see columnar.py), or None if the review data has not been converted """
+		def load():
+			from columnar import ReviewStore
+			store = ReviewStore(self.path('reviews_Madison_store'))
+			return store if os.path.isdir(store.directory) else None
+		return self.cached('review_store', load)
+
+	@property
+	def vocab(self):
+		""" the dictionary used in the LDA """
+		def load():
+			with open(self.path('dictionary.txt')) as f:
+				return [line.rstrip('\n') for line in f]
+		return self.cached('dictionary.txt', load)
+
+	@property
+	def topic_word(self):
+		return self.load_npy('topic_word.npy')
+
+	@property
+	def doc_topic(self):
+		return self.load_npy('doc_topic.npy')
+
+	def window(self, time_start, time_end, time_last):
+		""" the training set from time_start to time_end and the piglets of the test set from time_end to time_last """
+		return self.cached(('window', time_start, time_end, time_last), lambda: Window(self, time_start, time_end, time_last))
+
+	def forget_window(self, time_start, time_end, time_last):
+		""" forgets the loaded training set from time_start to time_end (e.g. when TrainingTestSet.py has recomputed it) """
+		window = self.cache.pop(('window', time_start, time_end, time_last), None)
+		if window is not None:
+			self.forget(*window.files())
+
+	def forget(self, *names):
+		""" forgets the loaded files names (e.g. topic_word.npy and dictionary.txt when a new LDA has been fitted) """
+		for name in names:
+			self.cache.pop(name, None)
+
+	def clear(self):
+		""" forgets all loaded data (e.g. when the files have been recomputed) """
+		self.cache = {}
+
+class Window:
+	def __init__(self, context, time_start, time_end, time_last):
+		""" the outputs of TrainingTestSet.py for the training set from time_start to time_end and test set from time_end to time_last; each
+		of them is loaded the first time it is used """
+		self.context = context
+		self.time_start = time_start
+		self.time_end = time_end
+		self.time_last = time_last
+		self.cache = {}
+
+	def cached(self, key, load):
+		if key not in self.cache:
+			self.cache[key] = load()
+		return self.cache[key]
+
+	def files(self):
+		""" the names of the files of the training set that are loaded through the data context """
+		interval = self.time_start + '_' + self.time_end + '.json'
+		return ['reviews_Madison_training_' + interval, 'costumer_ids_training_' + interval, 'business_ids_training_' + interval,
+			'piglets_' + self.time_end + '_' + self.time_last + '.json']
+
+	@property
+	def data_training(self):
+		""" the reviews of the training set """
+		return self.context.load_json(self.files()[0])
+
+	@property
+	def costumer_ids(self):
+		return self.context.load_json(self.files()[1])
+
+	@property
+	def business_ids(self):
+		return self.context.load_json(self.files()[2])
+
+	@property
+	def piglets(self):
+		return self.context.load_json(self.files()[3])
+
+	@property
+	def store(self):
+		""" the costumer and business profiles of the training set (see profiles.py) """
+		from profiles import ProfileStore
+		return self.cached('store', lambda: ProfileStore.load(self.context.directory, self.time_start, self.time_end))
+
+	@property
+	def index(self):
+		""" the index of the ratings of the training set (see ratings.py) """
+		from ratings import RatingIndex
+		return self.cached('index', lambda: RatingIndex(self.ratings(), self.store))
+
+	def ratings(self):
+		""" the costumer id, business id and rating of each review of the training set; if the review data has been converted to a columnar store,
+		the reviews of the training set are found with the date index (as in TrainingTestSet.py) and only these three fields are read from the
+		store, otherwise the reviews are read from the training set .json file """
+		store = self.context.review_store
+		if store is None:
+			return self.data_training
+		from TrainingTestSet import load_date_index, split
+		date_index = load_date_index(store.field('date'), self.context.path('date_index.npz'))
+		rows = split(date_index, self.time_start, self.time_end)[0]
+		return [{'user_id': u, 'business_id': b, 'stars': r} for u, b, r in zip(store.field('user_id', rows), store.field('business_id', rows),
+			store.field('stars', rows))]
+
+	def neighbours(self, min_reviewers=100):
+		""" the neighbour index over the costumer topic distributions of the training set (see neighbours.py) """
+		from neighbours import NeighbourIndex
+		return self.cached(('neighbours', min_reviewers), lambda: NeighbourIndex(self.store, self.index, min_reviewers))
+
+# the context shared by all modules
+shared = {}
+
+def get_context():
+	""" the shared data context; it is created the first time it is requested """
+	if 'context' not in shared:
+		shared['context'] = DataContext()
+	return shared['context']
+
+def set_directory(directory):
+	""" replaces the shared data context by a context for the data sets in directory """
+	shared['context'] = DataContext(directory)
+	return shared['context']
@@ -0,0 +1,59 @@
+# This file implements an index of the reviews by date that is used to split the reviews into training and test sets (see TrainingTestSet.py). The
+# review dates are sorted once; the reviews of any time interval are then found by binary search in the sorted dates, and are returned as a slice
+# (a view without copying) of the array of review indices in date order. The index is stored as date_index.npz, so it only has to be computed once
+# for a given review data set; it is stored together with a hash of the review dates it was built from, so that an index of a different data set
+# is recognized (even if it has the same number of reviews).
+
+# we load required packages
+import numpy as np
+from artifacts import digest
+
+def dates_digest(dates):
+	""" hash of the list of review dates (in the order of the reviews) """
+	return digest([str(date) for date in dates])
+
+class DateIndex:
+	def __init__(self, order, dates, key=None):
+		""" order is the array of review indices sorted by date and dates the corresponding (sorted) array of dates in the format '2011-01-01';
+		key is the hash of the review dates (see dates_digest) """
+		self.order = order
+		self.dates = dates
+		self.key = key
+
+	@classmethod
+	def build(cls, dates):
+		""" index of the list of review dates (in the order of the reviews) """
+		dates = np.array(dates)
+		order = np.argsort(dates, kind='mergesort')
+		return cls(order, dates[order], dates_digest(dates))
+
+	@classmethod
+	def load(cls, path):
+		index = np.load(path)
+		# indices saved without the hash of their dates are never reused by TrainingTestSet.load_date_index
+		key = str(index['key']) if 'key' in index.files else None
+		return cls(index['order'], index['dates'], key)
+
+	def save(self, path):
+		np.savez(path, order=self.order, dates=self.dates, key=self.key or '')
+
+	def __len__(self):
+		return len(self.order)
+
+	def first(self):
+		""" the date of the first review """
+		return str(self.dates[0])
+
+	def last(self):
+		""" the date of the last review """
+		return str(self.dates[-1])
+
+	def between(self, time_start, time_end):
+		""" indices of the reviews posted strictly after time_start and strictly before time_end, in date order """
+		lo = np.searchsorted(self.dates, time_start, side='right')
+		hi = np.searchsorted(self.dates, time_end, side='left')
+		return self.order[lo:max(lo, hi)]
+
+	def after(self, time):
+		""" indices of the reviews posted strictly after time, in date order """
+		return self.order[np.searchsorted(self.dates, time, side='right'):]
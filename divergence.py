@@ -0,0 +1,36 @@
+# This file implements the Jensen-Shannon distance used in predictor.py for numpy arrays of topic distributions; instead of comparing two costumers at a
+# time (see predictor.JS), the distances between one distribution and the rows of a matrix of distributions, between matching rows of two matrices, or
+# between all pairs of rows of two matrices are computed in one call. As in predictor.KL, terms with a zero probability contribute 0 (0*log(0) = 0).
+
+# we load required packages
+import numpy as np
+
+def KL(P, M):
+	""" Kullbach-Leibler divergence between the distributions in the last axis of P and M, where M is positive wherever P is """
+	P, M = np.broadcast_arrays(P, M)
+	positive = P > 0
+	terms = np.zeros(P.shape)
+	terms[positive] = P[positive] * np.log(P[positive] / M[positive])
+	return terms.sum(-1)
+
+def js_rowwise(P, Q):
+	""" Jensen-Shannon distances between the distributions P[i] and Q[i] for each row i of the (N x K) arrays P and Q (or between arrays that
+	can be broadcast against each other) """
+	P = np.asarray(P, dtype=np.float64)
+	Q = np.asarray(Q, dtype=np.float64)
+	M = (P + Q) / 2.
+	return (KL(P, M) + KL(Q, M)) / 2.
+
+def js_distances(p, Q):
+	""" Jensen-Shannon distances between the distribution p (of length K) and each row of the (N x K) array Q """
+	return js_rowwise(np.asarray(p, dtype=np.float64)[np.newaxis, :], Q)
+
+def js_pairwise(P, Q, chunk_size=256):
+	""" (N x M) array of Jensen-Shannon distances between each row of the (N x K) array P and each row of the (M x K) array Q; P is processed
+	in chunks of chunk_size rows to bound the memory used """
+	P = np.asarray(P, dtype=np.float64)
+	Q = np.asarray(Q, dtype=np.float64)
+	out = np.empty((P.shape[0], Q.shape[0]))
+	for start in range(0, P.shape[0], chunk_size):
+		out[start:start+chunk_size] = js_rowwise(P[start:start+chunk_size, np.newaxis, :], Q[np.newaxis, :, :])
+	return out
@@ -0,0 +1,82 @@
+# This file evaluates the predictions of predictor.py for all piglets at once; rather than predicting the rating of each business a piglet reviewed
+# one at a time (see predictor.piglet_performance_total), all pairs of piglets and test businesses are gathered first, and the JS weights of all
+# reviewers of these businesses as well as the weighted ratings are computed with grouped array operations over the profile store and the rating index
+# (see profiles.py and ratings.py). The pairs are processed in chunks so that at most max_entries (piglet, reviewer) distances are held in memory.
+
+# we load required packages
+import numpy as np
+from divergence import js_rowwise
+
+def test_pairs(piglets, store):
+	""" arrays of the costumer indices of the piglets, the indices of the businesses they reviewed during testing (if the business occurs in the
+	training set) and their true ratings, one entry for each such review """
+	users = []
+	businesses = []
+	true_ratings = []
+	for piglet in piglets:
+		u = store.costumer_index[piglet['id']]
+		for x, r in zip(piglet['test_restaurants'], piglet['test_restaurants_rating']):
+			b = store.business_index.get(x)
+			if b is not None:
+				users.append(u)
+				businesses.append(b)
+				true_ratings.append(r)
+	return np.array(users, dtype=np.int64), np.array(businesses, dtype=np.int64), np.array(true_ratings, dtype=np.float64)
+
+def predict(users, businesses, store, index, p=1, max_entries=1000000, neighbours=None, k=None):
+	""" predicted ratings (as in predictor.pred_rating) of the costumers with indices users for the businesses with indices businesses; if a
+	neighbour index (see neighbours.py) and k are given, only the k nearest reviewers of the indexed businesses are used """
+	if neighbours is not None and k is not None:
+		pair, pos = neighbours.candidates(users, businesses, k)
+		return weighted_ratings(pair, pos, users, store, index, p, len(users))
+	predictions = np.empty(len(users))
+	counts = index.indptr[businesses + 1] - index.indptr[businesses]
+	ends = np.cumsum(counts)
+	start = 0
+	while start < len(users):
+		# we take as many pairs as fit into max_entries (at least one)
+		stop = max(np.searchsorted(ends, ends[start] - counts[start] + max_entries, side='right'), start + 1)
+		pair, pos = reviewers(businesses[start:stop], index)
+		predictions[start:stop] = weighted_ratings(pair, pos, users[start:stop], store, index, p, stop - start)
+		start = stop
+	return predictions
+
+def predict_dist(dist, businesses, store, index, p=1):
+	""" predicted ratings of a costumer with topic distribution dist (e.g. one who is not in the training set) for the businesses with indices
+	businesses """
+	pair, pos = reviewers(businesses, index)
+	return weighted_dist_ratings(pair, pos, np.tile(dist, (len(businesses), 1)), store, index, p, len(businesses))
+
+def reviewers(businesses, index):
+	""" all reviewers of the businesses with indices businesses: pair[j] is the business (position in businesses) of entry j, and pos[j] the
+	position of its reviewer in the rating index """
+	counts = index.indptr[businesses + 1] - index.indptr[businesses]
+	pair = np.repeat(np.arange(len(businesses)), counts)
+	offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+	pos = np.repeat(index.indptr[businesses], counts) + offsets
+	return pair, pos
+
+def weighted_ratings(pair, pos, users, store, index, p, n):
+	""" the average ratings of the reviewers at positions pos in the rating index, weighted by 1 - JS distance to the costumer users[pair] to the 
+	power p, for each of the n pairs """
+	return weighted_dist_ratings(pair, pos, store.dists[users], store, index, p, n)
+
+def weighted_dist_ratings(pair, pos, dists, store, index, p, n):
+	""" as weighted_ratings, for the costumer topic distributions dists (one row for each of the n pairs) """
+	weights = pow(1 - js_rowwise(dists[pair], store.dists[index.rows[pos]]), p)
+	total = np.bincount(pair, weights * index.values[pos], n)
+	norm = np.bincount(pair, weights, n)
+	return total / norm
+
+def evaluate(piglets, store, index, p=1, max_entries=1000000, neighbours=None, k=None):
+	""" evaluates the average peformance of our prediction method over all piglets and compares them with the average performance of simply taking
+	the average rating; returns the same [prediction error, average rating error, number of ratings] as predictor.piglet_performance_total; 
+	neighbours and k optionally restrict the predictions to the k nearest reviewers (see predict) """
+	users, businesses, true_ratings = test_pairs(piglets, store)
+	N = len(users)
+	if N == 0:
+		return [float('nan'), float('nan'), 0]
+	predictions = predict(users, businesses, store, index, p, max_entries, neighbours, k)
+	S_prediction = np.abs(true_ratings - predictions).sum()
+	S_average = np.abs(true_ratings - store.business_ratings[businesses]).sum()
+	return [float(S_prediction)/N, float(S_average)/N, N]
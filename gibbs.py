@@ -0,0 +1,132 @@
+# This file runs the collapsed Gibbs sampler of the lda package (as used in LDA.fit_lda) on several cores, in one of two ways:
+# - several independent chains with different random seeds are run in parallel processes; either the chain with the highest log likelihood is kept,
+#   or the topics of all chains are matched to the topics of the best chain (by solving an assignment problem on the Hellinger distances between the
+#   topics, as the topics of different chains are only defined up to their order) and the matched topic and document distributions are averaged
+# - a single chain is run in the approximate distributed way of Newman et al. (AD-LDA): the reviews are split into one part per process, each process
+#   runs sync_every Gibbs sweeps over its part against its own copy of the topic-word counts, and the changes of the topic-word counts of all parts are
+#   then merged; the merged counts are exact, the approximation is that each part is sampled against counts that are up to sync_every sweeps stale
+# As in sweep.py, the count matrix is handed to the worker processes once, when the pool of processes is started (see workers.py).
+
+# we load required packages
+import numpy as np
+import lda, lda.utils, lda._lda
+from instrument import loglikelihood
+from workers import shared, start_pool, stop_pool, map_pool
+
+def run_chain(config):
+	""" runs one chain with K topics for N_iter iterations from random seed seed; returns its log likelihood and its topic and document distributions """
+	K, N_iter, seed, alpha, eta = config
+	model = lda.LDA(n_topics=K, n_iter=N_iter, alpha=alpha, eta=eta, random_state=seed)
+	model.fit(shared['Y'])
+	return model.loglikelihood(), model.topic_word_, model.doc_topic_
+
+def hellinger_distances(P, Q):
+	""" matrix of the Hellinger distances between the rows of P and the rows of Q """
+	return np.sqrt(np.maximum(1 - np.dot(np.sqrt(P), np.sqrt(Q).T), 0))
+
+def align(reference, topic_word):
+	""" permutation of the topics in topic_word that matches them best (by the sum of their Hellinger distances) to the topics in reference """
+	from scipy.optimize import linear_sum_assignment
+	rows, cols = linear_sum_assignment(hellinger_distances(reference, topic_word))
+	return cols[np.argsort(rows)]
+
+def fit_chains(Y, K, N_iter, n_chains=4, n_jobs=1, combine='best', alpha=0.1, eta=0.01, seed=1):
+	""" runs n_chains chains (with the random seeds seed, seed+1, ...) on n_jobs processes; if combine is 'best' the topic and document
+	distributions of the chain with the highest log likelihood are returned, if it is 'average' the aligned distributions of all chains are averaged;
+	returns topic_word, doc_topic and the list of the log likelihoods of the chains """
+	if combine not in ('best', 'average'):
+		raise ValueError('unknown combine {}'.format(combine))
+	shared['Y'] = Y
+	pool = start_pool(min(n_jobs, n_chains))
+	try:
+		chains = map_pool(pool, run_chain, [(K, N_iter, seed + c, alpha, eta) for c in range(0,n_chains)])
+	finally:
+		stop_pool(pool)
+		shared['Y'] = None
+	loglikelihoods = [chain[0] for chain in chains]
+	for c in range(0,n_chains):
+		loglikelihood('lda.fit', N_iter, loglikelihoods[c], mode='chains', chain=c)
+	best = int(np.argmax(loglikelihoods))
+	topic_word, doc_topic = chains[best][1], chains[best][2]
+	if combine == 'average':
+		topic_word = np.zeros_like(topic_word)
+		doc_topic = np.zeros_like(doc_topic)
+		for ll, tw, dt in chains:
+			perm = align(chains[best][1], tw)
+			topic_word = topic_word + tw[perm]
+			doc_topic = doc_topic + dt[:, perm]
+		topic_word = topic_word / topic_word.sum(1)[:, np.newaxis]
+		doc_topic = doc_topic / doc_topic.sum(1)[:, np.newaxis]
+	return topic_word, doc_topic, loglikelihoods
+
+def doc_topic_counts(DS, ZS, D, K):
+	""" (D x K) counts of the topic assignments ZS of the words of the reviews DS """
+	return np.bincount(DS * K + ZS, minlength=D * K).reshape(D, K).astype(np.intc)
+
+def sample_part(job):
+	""" runs n_sweeps Gibbs sweeps over the words of part number part with the topic assignments ZS, against the topic-word counts nzw; returns the
+	new topic assignments and the change of the topic-word counts """
+	part, ZS, nzw, n_sweeps, seed = job
+	WS, DS, D = shared['parts'][part]
+	alpha, eta = shared['alpha'], shared['eta']
+	K, V = nzw.shape
+	nzw_part = np.array(nzw, dtype=np.intc, order='F')
+	nz_part = nzw_part.sum(1).astype(np.intc)
+	ndz = doc_topic_counts(DS, ZS, D, K)
+	random_state = np.random.RandomState(seed)
+	rands = random_state.rand(1024**2 // 8)
+	for s in range(0,n_sweeps):
+		random_state.shuffle(rands)
+		lda._lda._sample_topics(WS, DS, ZS, nzw_part, ndz, nz_part, np.repeat(alpha, K).astype(np.float64), np.repeat(eta, V).astype(np.float64), rands)
+	return ZS, nzw_part - nzw
+
+def fit_distributed(Y, K, N_iter, n_jobs=2, sync_every=10, alpha=0.1, eta=0.01, seed=1):
+	""" runs a single chain with K topics for N_iter sweeps, with the reviews of Y split into n_jobs parts that are sampled in parallel and merged
+	every sync_every sweeps (AD-LDA); returns topic_word, doc_topic and the log likelihoods after each merge """
+	import scipy.sparse
+	Y = scipy.sparse.csr_matrix(Y)
+	D, V = Y.shape
+	bounds = np.linspace(0, D, n_jobs + 1).astype(np.int64)
+
+	# we split the reviews into contiguous parts and assign the words their initial topics as in the lda package
+	parts = []
+	assignments = []
+	nzw = np.zeros((K, V), dtype=np.intc, order='F')
+	offset = 0
+	for j in range(0,n_jobs):
+		WS, DS = lda.utils.matrix_to_lists(Y[bounds[j]:bounds[j+1]]) if bounds[j+1] > bounds[j] else (np.zeros(0, np.intc), np.zeros(0, np.intc))
+		ZS = ((offset + np.arange(len(WS))) % K).astype(np.intc)
+		offset = offset + len(WS)
+		np.add.at(nzw, (ZS, WS), 1)
+		parts.append((WS, DS, int(bounds[j+1] - bounds[j])))
+		assignments.append(ZS)
+	ndz = np.vstack([doc_topic_counts(parts[j][1], assignments[j], parts[j][2], K) for j in range(0,n_jobs)])
+
+	shared['parts'] = parts
+	shared['alpha'] = alpha
+	shared['eta'] = eta
+	pool = start_pool(n_jobs)
+	loglikelihoods = []
+	try:
+		done = 0
+		while done < N_iter:
+			n_sweeps = min(sync_every, N_iter - done)
+			jobs = [(j, assignments[j], nzw, n_sweeps, seed + 1000003 * done + j) for j in range(0,n_jobs)]
+			results = map_pool(pool, sample_part, jobs)
+			assignments = [ZS for ZS, delta in results]
+			for ZS, delta in results:
+				nzw += delta
+			done = done + n_sweeps
+			ndz = np.vstack([doc_topic_counts(parts[j][1], assignments[j], parts[j][2], K) for j in range(0,n_jobs)])
+			nz = nzw.sum(1).astype(np.intc)
+			loglikelihoods.append(lda._lda._loglikelihood(nzw, ndz, nz, ndz.sum(1).astype(np.intc), alpha, eta))
+			loglikelihood('lda.fit', done, loglikelihoods[-1], mode='distributed')
+	finally:
+		stop_pool(pool)
+		shared['parts'] = None
+
+	topic_word = (nzw + eta).astype(np.float64)
+	topic_word = topic_word / topic_word.sum(1)[:, np.newaxis]
+	doc_topic = (ndz + alpha).astype(np.float64)
+	doc_topic = doc_topic / doc_topic.sum(1)[:, np.newaxis]
+	return topic_word, doc_topic, loglikelihoods
@@ -0,0 +1,104 @@
+# This file computes the topic loadings (doc_topic) of new reviews against a frozen LDA model, i.e. the topic distributions topic_word.npy and the
+# dictionary dictionary.txt as computed by LDA.py and Dictionary.py, without refitting the model. The review texts are normalized by the same token
+# pipeline as the one used for the LDA (see tokens.py) and the topic loadings are inferred by folding the reviews into the model, either by a fixed number
+# of variational iterations (as in the E-step of the online LDA, see onlinelda.py) or by a fixed number of Gibbs sampling sweeps; in both cases all reviews
+# of a batch are processed at once using array operations
+
+# usage:
+#	model = TopicInference.load()
+#	doc_topic = model.transform(['Great burgers, but the service was slow', ...])
+
+# we load required packages
+import os
+import numpy as np
+import scipy.sparse
+from context import get_context
+
+class TopicInference:
+	def __init__(self, topic_word, vocab, alpha=0.1):
+		""" topic_word is the (K x V) array of topic distributions over the dictionary vocab; alpha is the document prior (0.1 is the
+		default of the lda package used in LDA.fit_lda) """
+		from tokens import TokenPipeline
+		self.topic_word = np.asarray(topic_word, dtype=np.float64)
+		self.vocab = vocab
+		self.vocab_map = dict((vocab[i], i) for i in range(0,len(vocab)))
+		self.alpha = alpha
+		self.pipeline = TokenPipeline(vocab=vocab)
+
+	@classmethod
+	def load(cls, directory=None, alpha=0.1):
+		""" loads topic_word.npy and dictionary.txt from directory (the Data_Sets_Madison folder by default) """
+		if directory is None:
+			directory = get_context().directory
+		with open(os.path.join(directory, 'dictionary.txt')) as f:
+			vocab = [line.rstrip('\n') for line in f]
+		topic_word = np.load(os.path.join(directory, 'topic_word.npy'))
+		return cls(topic_word, vocab, alpha)
+
+	def counts(self, texts):
+		""" sparse 'bag of words' matrix of the review texts """
+		from LDA import count_matrix
+		return count_matrix(self.pipeline(texts), self.vocab_map)
+
+	def transform(self, texts, method='variational', n_iter=20, batch_size=1000, random_state=1):
+		""" returns the topic loadings (len(texts) x K) of the review texts; method is either 'variational' or 'gibbs', n_iter is the
+		number of iterations/sweeps, and the reviews are processed in batches of batch_size reviews """
+		return self.transform_counts(self.counts(texts), method, n_iter, batch_size, random_state)
+
+	def transform_counts(self, X, method='variational', n_iter=20, batch_size=1000, random_state=1):
+		""" as transform, for a sparse count matrix X of reviews (as computed by LDA.setting()) """
+		X = scipy.sparse.csr_matrix(X)
+		random_state = np.random.RandomState(random_state)
+		if method == 'variational':
+			fold_in = self.variational
+		elif method == 'gibbs':
+			fold_in = self.gibbs
+		else:
+			raise ValueError('unknown method {}'.format(method))
+		K = self.topic_word.shape[0]
+		parts = [fold_in(X[start:start+batch_size], n_iter, random_state) for start in range(0, X.shape[0], batch_size)]
+		if not parts:
+			return np.zeros((0, K))
+		return np.vstack(parts)
+
+	def variational(self, X, n_iter, random_state):
+		""" variational fold-in: n_iter iterations of the E-step with the topics held fixed """
+		from onlinelda import e_step
+		K = self.topic_word.shape[0]
+		gamma, sstats = e_step(X, self.topic_word, self.alpha, n_iter=n_iter, tol=0, gamma=np.ones((X.shape[0], K)))
+		return gamma / gamma.sum(1)[:, np.newaxis]
+
+	def gibbs(self, X, n_iter, random_state):
+		""" Gibbs fold-in: n_iter sweeps over the topic assignments of all words, with the topics held fixed; the assignments of all words are
+		resampled at once given the topic counts of their review at the beginning of the sweep, and the topic counts are averaged over the second
+		half of the sweeps """
+		K = self.topic_word.shape[0]
+		D = X.shape[0]
+		coo = X.tocoo()
+		docs = np.repeat(coo.row, coo.data)
+		words = np.repeat(coo.col, coo.data)
+		phi = self.topic_word[:, words].T
+		z = sample(phi, random_state)
+		ndz = np.bincount(docs * K + z, minlength=D * K).reshape(D, K)
+		total = np.zeros((D, K))
+		n_kept = 0
+		for it in range(n_iter):
+			# the topic counts of its review without the word itself
+			own = np.zeros((len(z), K))
+			own[np.arange(len(z)), z] = 1
+			z = sample((ndz[docs] - own + self.alpha) * phi, random_state)
+			ndz = np.bincount(docs * K + z, minlength=D * K).reshape(D, K)
+			if 2 * it >= n_iter - 1:
+				total = total + ndz
+				n_kept = n_kept + 1
+		if n_kept == 0:
+			total = ndz.astype(np.float64)
+			n_kept = 1
+		doc_topic = total / float(n_kept) + self.alpha
+		return doc_topic / doc_topic.sum(1)[:, np.newaxis]
+
+def sample(weights, random_state):
+	""" draws one index per row of weights with probabilities proportional to the row """
+	cumulative = np.cumsum(weights, 1)
+	u = random_state.random_sample(weights.shape[0]) * cumulative[:, -1]
+	return np.minimum((cumulative < u[:, np.newaxis]).sum(1), weights.shape[1] - 1)
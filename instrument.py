@@ -0,0 +1,156 @@
+# This file implements the instrumentation of the pipeline stages (Dictionary.py, LDA.py, TrainingTestSet.py and predictor.py): each stage reports its
+# wall time, the number of items it processed (reviews, documents, predictions) and their throughput, and the peak memory of the process, as one JSON
+# object per line. The log likelihoods of the Gibbs sampler are reported in the same way while the LDA is fitted. Optionally, each outermost stage is
+# run under cProfile and its hottest functions (by cumulative time) are added to its report.
+#
+# The reports are off unless a destination is set, either with the environment variable YELP_INSTRUMENT (a file the lines are appended to, or - for
+# stderr) or with configure(); profiling is enabled with the environment variable YELP_PROFILE (the number of functions to report) or configure().
+# All reports of a process go to the same file, even though the stages change the current folder.
+
+# usage:
+#	with Stage('lda.setting', unit='reviews') as s:
+#		...
+#		s.count(len(texts))
+
+# we load required packages
+import os, sys, json, time, logging, threading
+
+# the destination of the reports and the profiling options; they are read from the environment when the first report is made
+state = {}
+
+# the current folder when this module is first imported; a relative YELP_INSTRUMENT path is taken relative to it, since the stages change the
+# current folder (e.g. to the data folder) before they report
+start_directory = os.getcwd()
+
+def configure(path=None, profile=0):
+	""" sends the reports to the file path (- for stderr, None to switch them off) and reports the profile functions with the largest cumulative time
+	of each outermost stage (no profiling if profile is 0); a relative path is taken relative to the current folder at the time of this call """
+	state['path'] = os.path.abspath(path) if path not in (None, '-') else path
+	state['profile'] = int(profile)
+	state['lock'] = threading.Lock()
+	state['depth'] = 0
+
+def settings():
+	if 'path' not in state:
+		path = os.environ.get('YELP_INSTRUMENT') or None
+		if path not in (None, '-'):
+			path = os.path.join(start_directory, path)
+		configure(path, os.environ.get('YELP_PROFILE') or 0)
+	return state
+
+def enabled():
+	return settings()['path'] is not None
+
+def emit(event, **fields):
+	""" writes the report event with the given fields as one JSON line (if the reports are switched on) """
+	s = settings()
+	if s['path'] is None:
+		return
+	record = dict(fields, event=event, time=time.time(), pid=os.getpid())
+	line = json.dumps(record, sort_keys=True, default=float) + '\n'
+	with s['lock']:
+		if s['path'] == '-':
+			sys.stderr.write(line)
+			sys.stderr.flush()
+		else:
+			with open(s['path'], 'a') as fp:
+				fp.write(line)
+
+def peak_rss():
+	""" the peak resident set size of this process in MB (None where it is not available) """
+	try:
+		import resource
+	except ImportError:
+		return None
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return rss / (1024. * 1024.) if sys.platform == 'darwin' else rss / 1024.
+
+class Stage:
+	def __init__(self, name, unit='items', items=None, **fields):
+		""" reports the stage name when it ends; items is the number of items of the given unit the stage processes (if known in advance, otherwise
+		they are counted with count()); fields are added to the report """
+		self.name = name
+		self.unit = unit
+		self.items = items
+		self.fields = fields
+		self.profiler = None
+
+	def count(self, n=1):
+		""" counts n more processed items """
+		self.items = (self.items or 0) + n
+
+	def __enter__(self):
+		s = settings()
+		if s['path'] is not None and s['profile'] and s['depth'] == 0:
+			import cProfile
+			self.profiler = cProfile.Profile()
+			self.profiler.enable()
+		s['depth'] = s['depth'] + 1
+		self.start = time.time()
+		return self
+
+	def __exit__(self, type, value, traceback):
+		wall = time.time() - self.start
+		s = settings()
+		s['depth'] = s['depth'] - 1
+		fields = dict(self.fields)
+		if self.profiler is not None:
+			self.profiler.disable()
+			fields['hot'] = hot_functions(self.profiler, s['profile'])
+		fields.update(stage=self.name, wall_s=wall, unit=self.unit, items=self.items, peak_rss_mb=peak_rss(),
+			status='error' if type is not None else 'ok')
+		if self.items is not None and wall > 0:
+			fields['per_s'] = self.items / wall
+		emit('stage', **fields)
+		return False
+
+def hot_functions(profiler, n):
+	""" the n functions with the largest cumulative time in profiler """
+	import pstats
+	stats = pstats.Stats(profiler).stats
+	rows = sorted(stats.items(), key=lambda item: -item[1][3])[:n]
+	return [{'function': '{}:{}({})'.format(os.path.basename(f[0]), f[1], f[2]), 'calls': s[1], 'tottime': s[2], 'cumtime': s[3]} for f, s in rows]
+
+def counted(items, s):
+	""" yields the items of the iterable items, counting them in the stage s """
+	for item in items:
+		s.count()
+		yield item
+
+class LoglikelihoodHandler(logging.Handler):
+	def __init__(self, name):
+		""" reports the log likelihoods logged by the lda package (every refresh iterations) under the stage name """
+		logging.Handler.__init__(self)
+		self.name_ = name
+
+	def emit(self, record):
+		message = record.getMessage()
+		if 'log likelihood' in message:
+			iteration, value = message.split('log likelihood:')
+			loglikelihood(self.name_, int(iteration.strip().strip('<>')), float(value))
+
+def loglikelihood(name, iteration, value, **fields):
+	""" reports the log likelihood value of the Gibbs sampler of stage name at iteration """
+	emit('loglikelihood', stage=name, iteration=iteration, loglikelihood=value, **fields)
+
+class GibbsProgress:
+	def __init__(self, name):
+		""" while active, the log likelihoods logged by the lda package are reported under the stage name """
+		self.handler = LoglikelihoodHandler(name)
+
+	def __enter__(self):
+		if enabled():
+			logger = logging.getLogger('lda')
+			logger.addHandler(self.handler)
+			# the lda package logs the log likelihoods at level INFO
+			self.level = logger.level
+			if logger.getEffectiveLevel() > logging.INFO:
+				logger.setLevel(logging.INFO)
+		return self
+
+	def __exit__(self, type, value, traceback):
+		if enabled():
+			logger = logging.getLogger('lda')
+			logger.removeHandler(self.handler)
+			logger.setLevel(self.level)
+		return False
@@ -0,0 +1,74 @@
+# This file implements the log odds ratio with an informative Dirichlet prior of Monroe et al. (2008) (see Papers/ and Dictionary.py) for all words of a
+# vocabulary at once. The word counts of the reviews are kept per star rating (RatingCounts), so that the counts of any corpus defined by ratings (e.g. the
+# reviews with 1 or 2 stars against those with 4 or 5 stars) are obtained by summing rows rather than by counting the reviews again. For two corpora i and
+# j with word counts y_i and y_j, sizes n_i and n_j, and prior counts a (with a_0 the sum of a), the log odds ratio of word w is
+#	delta_w = log((y_iw + a_w) / (n_i + a_0 - y_iw - a_w)) - log((y_jw + a_w) / (n_j + a_0 - y_jw - a_w))
+# with approximate variance 1/(y_iw + a_w) + 1/(y_jw + a_w); the z-score is delta_w divided by its standard deviation.
+
+# we load required packages
+import numpy as np
+
+class RatingCounts:
+	def __init__(self, words, ratings, counts):
+		""" words is the vocabulary, ratings the array of star ratings and counts the (number of ratings x number of words) array of the number of
+		times each word occurs in the reviews with each rating """
+		self.words = words
+		self.ratings = np.asarray(ratings)
+		self.counts = np.asarray(counts, dtype=np.int64)
+
+	@classmethod
+	def build(cls, codes, by_rating):
+		""" codes maps each word to its column and by_rating each star rating to a Counter of the columns of the words in the reviews with this rating """
+		words = [None] * len(codes)
+		for word, code in codes.items():
+			words[code] = word
+		ratings = sorted(by_rating)
+		counts = np.zeros((len(ratings), len(words)), dtype=np.int64)
+		for r in range(0,len(ratings)):
+			counter = by_rating[ratings[r]]
+			counts[r, list(counter.keys())] = list(counter.values())
+		return cls(words, ratings, counts)
+
+	@classmethod
+	def load(cls, path):
+		data = np.load(path, allow_pickle=False)
+		return cls(data['words'].tolist(), data['ratings'], data['counts'])
+
+	def save(self, path):
+		np.savez(path, words=np.array(self.words), ratings=self.ratings, counts=self.counts)
+
+	def corpus(self, stars=None):
+		""" the word counts of the reviews whose rating is in stars (all reviews if stars is None) """
+		if stars is None:
+			return self.counts.sum(0)
+		return self.counts[np.isin(self.ratings, list(stars))].sum(0)
+
+	def counter(self, stars=None):
+		""" the word counts of the reviews whose rating is in stars as a Counter (without the words that do not occur), in the order of the vocabulary """
+		from collections import Counter
+		y = self.corpus(stars)
+		return Counter(dict((self.words[w], int(y[w])) for w in np.nonzero(y)[0]))
+
+def log_odds(y_i, y_j, prior):
+	""" log odds ratios delta, their variances and z-scores of all words for corpus i against corpus j, where y_i and y_j are the word counts of the
+	two corpora and prior the counts of the informative Dirichlet prior (e.g. the counts of all reviews) """
+	y_i = np.asarray(y_i, dtype=np.float64)
+	y_j = np.asarray(y_j, dtype=np.float64)
+	a = np.asarray(prior, dtype=np.float64)
+	n_i, n_j, a_0 = y_i.sum(), y_j.sum(), a.sum()
+	with np.errstate(divide='ignore', invalid='ignore'):
+		delta = np.log((y_i + a) / (n_i + a_0 - y_i - a)) - np.log((y_j + a) / (n_j + a_0 - y_j - a))
+		variance = 1 / (y_i + a) + 1 / (y_j + a)
+		z = delta / np.sqrt(variance)
+	return delta, variance, z
+
+def score_split(counts, stars_i, stars_j=None, prior=None, columns=None):
+	""" log odds ratios, variances and z-scores of the reviews with ratings in stars_i against those with ratings in stars_j (all reviews if stars_j is
+	None), for the words with indices columns (all words if None); the prior are the counts of all reviews unless specified otherwise """
+	y_i = counts.corpus(stars_i)
+	y_j = counts.corpus(stars_j)
+	if prior is None:
+		prior = counts.corpus()
+	if columns is not None:
+		y_i, y_j, prior = y_i[columns], y_j[columns], np.asarray(prior)[columns]
+	return log_odds(y_i, y_j, prior)
@@ -0,0 +1,105 @@
+# This file implements an optional neighbour index over the topic distributions of the costumers of a training set, which lets the predictions of
+# predictor.py weight only the k reviewers of a business whose topic distributions are most similar to the costumer's, rather than all reviewers. The
+# topic distributions are embedded by taking their square roots, so that the Euclidean distance between two embeddings is sqrt(2) times the Hellinger
+# distance between the distributions, which is a close proxy of the JS distance (both are f-divergences and agree to second order); the embeddings of
+# the reviewers of each business with at least min_reviewers reviewers are indexed with a KD-tree (scipy.spatial.cKDTree). Businesses with fewer
+# reviewers are not indexed, and all of their reviewers are used as before. The weights of the selected reviewers are still the exact 1 - JS distances.
+
+# the speed and the error of the predictions with and without the index are compared using the command
+#	python neighbours.py --k 10 25 50 --p 1 --min-reviewers 100
+
+# we load required packages
+import time, argparse
+import numpy as np
+from scipy.spatial import cKDTree
+
+def hellinger(dists):
+	""" embeddings of the topic distributions dists (one per row) in which the Euclidean distance is proportional to the Hellinger distance """
+	return np.sqrt(np.maximum(np.asarray(dists, dtype=np.float64), 0))
+
+class NeighbourIndex:
+	def __init__(self, store, index, min_reviewers=100, leafsize=16):
+		""" store is the profile store and index the rating index of a training set (see profiles.py and ratings.py); a KD-tree is built for each
+		business with at least min_reviewers reviewers """
+		self.index = index
+		self.embeddings = hellinger(store.dists)
+		self.counts = index.indptr[1:] - index.indptr[:-1]
+		self.trees = {}
+		for b in np.nonzero(self.counts >= min_reviewers)[0]:
+			rows = index.rows[index.indptr[b]:index.indptr[b+1]]
+			self.trees[b] = cKDTree(self.embeddings[rows], leafsize=leafsize)
+
+	def nearest(self, u, b, k):
+		""" positions (in the rating index) of the k reviewers of business b that are nearest to costumer u, or of all reviewers of b if b is not
+		indexed """
+		start = self.index.indptr[b]
+		if b not in self.trees:
+			return np.arange(start, self.index.indptr[b+1])
+		distances, nn = self.trees[b].query(self.embeddings[u], k=min(k, self.counts[b]))
+		return start + np.atleast_1d(nn)
+
+	def candidates(self, users, businesses, k):
+		""" for the pairs of costumer indices users and business indices businesses, returns the arrays pair and pos, where pos[j] is the position
+		(in the rating index) of a reviewer that is used for the prediction of the pair pair[j]; the queries of all pairs of a business are made
+		in one call """
+		indexed = np.array([b in self.trees for b in businesses], dtype=bool)
+
+		# all reviewers of the businesses that are not indexed
+		small = np.nonzero(~indexed)[0]
+		c = self.counts[businesses[small]]
+		pairs = [np.repeat(small, c)]
+		offsets = np.arange(c.sum()) - np.repeat(np.cumsum(c) - c, c)
+		positions = [np.repeat(self.index.indptr[businesses[small]], c) + offsets]
+
+		# the k nearest reviewers for the indexed businesses, grouped by business
+		large = np.nonzero(indexed)[0]
+		large = large[np.argsort(businesses[large], kind='mergesort')]
+		bounds = np.nonzero(np.diff(businesses[large]))[0] + 1
+		for group in np.split(large, bounds) if len(large) else []:
+			b = businesses[group[0]]
+			kb = min(k, self.counts[b])
+			distances, nn = self.trees[b].query(self.embeddings[users[group]], k=kb)
+			pairs.append(np.repeat(group, kb))
+			positions.append(self.index.indptr[b] + np.asarray(nn).reshape(len(group), kb).ravel())
+		return np.concatenate(pairs), np.concatenate(positions)
+
+def benchmark(ks, ps=(1,), min_reviewers=100, repeat=3):
+	""" compares the time and the prediction error of evaluation.evaluate over all piglets of the training set of predictor.py without the neighbour
+	index and with it, for each number of neighbours in ks and each power in ps; returns the rows of the comparison """
+	from predictor import window
+	from evaluation import evaluate
+	store, index, piglets = window().store, window().index, window().piglets
+
+	def timed(f):
+		best = None
+		for r in range(0,repeat):
+			t = time.time()
+			result = f()
+			best = time.time() - t if best is None else min(best, time.time() - t)
+		return result, best
+
+	t = time.time()
+	neighbours = NeighbourIndex(store, index, min_reviewers)
+	build = time.time() - t
+
+	rows = []
+	for p in ps:
+		(s_exact, s_average, n), t_exact = timed(lambda: evaluate(piglets, store, index, p))
+		rows.append(['exact', p, n, t_exact, s_exact, s_average])
+		for k in ks:
+			(s_prediction, s_average, n), t_k = timed(lambda: evaluate(piglets, store, index, p, neighbours=neighbours, k=k))
+			rows.append([k, p, n, t_k, s_prediction, s_average])
+	return rows, build, len(neighbours.trees)
+
+def main():
+	parser = argparse.ArgumentParser(description='speed and error of the predictions with the neighbour index')
+	parser.add_argument('--k', type=int, nargs='+', default=[10, 25, 50])
+	parser.add_argument('--p', type=float, nargs='+', default=[1.])
+	parser.add_argument('--min-reviewers', type=int, default=100)
+	args = parser.parse_args()
+	rows, build, n_trees = benchmark(args.k, args.p, args.min_reviewers)
+	print('neighbour index: {} businesses indexed in {:.3f}s'.format(n_trees, build))
+	for row in rows:
+		print('k = {}, p = {}: N = {}, time {:.4f}s, prediction error {:.4f}, average error {:.4f}'.format(*row))
+
+if __name__ == '__main__':	main()
@@ -0,0 +1,109 @@
+# This file implements the online variational Bayes algorithm for LDA of M. Hoffman, D. Blei and F. Bach (see HoffmanBleiBach2010b.pdf). Unlike the
+# batch version in LDA.py (collapsed Gibbs sampling over the whole corpus), the topics are updated from mini-batches of reviews, so that newly arriving
+# reviews can be added to the model without refitting it on all past reviews; the cost of an update only depends on the size of the new batch. The
+# state of the model (the variational topic parameters lambda and the number of updates so far) can be saved to and loaded from a .npz file.
+
+# the reviews are given as a sparse (D x V) matrix of word counts as computed by LDA.setting(); the variational E-step is computed for all
+# reviews of a batch at once using sparse matrix products, rather than review by review as in the original implementation of the algorithm
+
+# we load required packages
+import numpy as np
+import scipy.sparse
+from scipy.special import psi
+
+def dirichlet_expectation(alpha):
+	""" E[log(theta)] for theta ~ Dirichlet(alpha), computed for each row of alpha """
+	return psi(alpha) - psi(np.sum(alpha, 1))[:, np.newaxis]
+
+def e_step(X, expElogbeta, alpha, n_iter=100, tol=1e-3, gamma=None, random_state=None):
+	""" variational E-step for the reviews X (a sparse count matrix) given the topics expElogbeta (K x V); returns the variational document
+	parameters gamma (D x K) as well as the sufficient statistics for the topics (K x V); alpha is the document prior """
+	X = scipy.sparse.csr_matrix(X)
+	D = X.shape[0]
+	K = expElogbeta.shape[0]
+	if gamma is None:
+		if not isinstance(random_state, np.random.RandomState):
+			random_state = np.random.RandomState(random_state)
+		gamma = random_state.gamma(100., 1./100., (D, K))
+	coo = X.tocoo()
+	rows, cols, cts = coo.row, coo.col, coo.data.astype(np.float64)
+	betaT = expElogbeta.T
+
+	def weighted_counts(expElogtheta):
+		# phinorm is the normalizer of the word-topic responsibilities of each nonzero count; we return the counts divided by phinorm
+		phinorm = np.einsum('ik,ik->i', expElogtheta[rows], betaT[cols]) + 1e-100
+		return scipy.sparse.csr_matrix((cts / phinorm, (rows, cols)), shape=X.shape)
+
+	expElogtheta = np.exp(dirichlet_expectation(gamma))
+	for it in range(n_iter):
+		lastgamma = gamma
+		gamma = alpha + expElogtheta * (weighted_counts(expElogtheta).dot(betaT))
+		expElogtheta = np.exp(dirichlet_expectation(gamma))
+		if D == 0 or np.max(np.mean(np.abs(gamma - lastgamma), 1)) < tol:
+			break
+
+	sstats = expElogbeta * np.asarray(weighted_counts(expElogtheta).T.dot(expElogtheta)).T
+	return gamma, sstats
+
+class OnlineLDA:
+	def __init__(self, K, V, alpha=None, eta=None, tau0=1024., kappa=0.7, random_state=1):
+		""" K is the number of topics and V the size of the dictionary; alpha and eta are the document and topic priors (1/K by default);
+		tau0 and kappa set the learning rate (tau0 + t)^(-kappa) of the t-th update """
+		self.K = K
+		self.V = V
+		self.alpha = 1./K if alpha is None else alpha
+		self.eta = 1./K if eta is None else eta
+		self.tau0 = tau0
+		self.kappa = kappa
+		self.random_state = np.random.RandomState(random_state)
+		self.updatect = 0
+		self.n_docs = 0
+		self.lam = self.random_state.gamma(100., 1./100., (K, V))
+
+	def expElogbeta(self):
+		return np.exp(dirichlet_expectation(self.lam))
+
+	def update(self, X):
+		""" updates the topics with the mini-batch of reviews X and returns the variational parameters gamma of these reviews """
+		X = scipy.sparse.csr_matrix(X)
+		self.n_docs = self.n_docs + X.shape[0]
+		rhot = pow(self.tau0 + self.updatect, -self.kappa)
+		gamma, sstats = e_step(X, self.expElogbeta(), self.alpha, random_state=self.random_state)
+		# the batch is treated as a sample of all n_docs reviews seen so far
+		self.lam = self.lam * (1 - rhot) + rhot * (self.eta + self.n_docs * sstats / float(max(X.shape[0], 1)))
+		self.updatect = self.updatect + 1
+		return gamma
+
+	def partial_fit(self, Y, batch_size=256):
+		""" updates the topics with the reviews Y, split into mini-batches of batch_size reviews; returns the document loadings doc_topic of Y """
+		Y = scipy.sparse.csr_matrix(Y)
+		for start in range(0, Y.shape[0], batch_size):
+			self.update(Y[start:start+batch_size])
+		return self.transform(Y)
+
+	def transform(self, Y):
+		""" infers the document loadings doc_topic of the reviews Y without changing the topics """
+		gamma, sstats = e_step(Y, self.expElogbeta(), self.alpha, random_state=self.random_state)
+		return gamma / gamma.sum(1)[:, np.newaxis]
+
+	@property
+	def topic_word(self):
+		""" the topic distributions over the dictionary (K x V) """
+		return self.lam / self.lam.sum(1)[:, np.newaxis]
+
+	def save(self, path):
+		""" saves the state of the model to the .npz file path """
+		np.savez(path, lam=self.lam, alpha=self.alpha, eta=self.eta, tau0=self.tau0, kappa=self.kappa, updatect=self.updatect,
+			n_docs=self.n_docs, random_state=np.array(self.random_state.get_state(), dtype=object))
+
+	@classmethod
+	def load(cls, path):
+		""" loads a model saved with save() """
+		state = np.load(path, allow_pickle=True)
+		K, V = state['lam'].shape
+		model = cls(K, V, alpha=float(state['alpha']), eta=float(state['eta']), tau0=float(state['tau0']), kappa=float(state['kappa']))
+		model.lam = state['lam']
+		model.updatect = int(state['updatect'])
+		model.n_docs = int(state['n_docs'])
+		model.random_state.set_state(tuple(state['random_state']))
+		return model
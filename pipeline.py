@@ -0,0 +1,224 @@
+# This file runs the whole pipeline (Dictionary.py -> LDA.setting -> LDA.fit_lda -> TrainingTestSet.py -> predictor.py) as a graph of stages, each of
+# which stores its outputs in the artifact cache (see artifacts.py) under a hash of its inputs and parameters: the contents of the review data for the
+# stages that read it, the hashes of the stages it depends on, and its own parameters (the dictionary size, K, N_iter and random_state of the LDA, the
+# dates of the training set and the power p). A stage whose hash is already in the cache is skipped, so that after changing a parameter only the stages
+# that depend on it are recomputed; stages that do not depend on each other (e.g. the profiles of several training sets, or the evaluations for several
+# values of p) run concurrently on a pool of n_jobs processes.
+#
+# Each stage runs in its own artifact folder, which is set as the data folder of the data context (see context.py) while the stage runs; the outputs
+# of the stages it depends on are linked into this folder under their usual names, so that the scripts read and write the same files as before. With
+# --publish, the outputs of all stages are also copied to the data folder, where predictor.py and server.py find them.
+
+# the pipeline is run using the command
+#	python pipeline.py --size 1000 --K 20 --N_iter 500 --windows 2005-03-03:2013-07-16 2005-03-03:2012-07-16 --p 1 2 --jobs 4
+
+# we load required packages
+import os, sys, json, time, shutil, argparse, multiprocessing
+from artifacts import ArtifactCache, digest, file_digest
+from context import get_context
+
+# the files each kind of stage reads from the stages it depends on (or, for 'source', from the data folder), in the order of these stages; None stands
+# for all files of the stage
+INPUTS = {
+	'dictionary': [['reviews_Madison.json']],
+	'featurize': [['reviews_Madison.json'], ['dictionary.txt']],
+	'lda': [['reviews_Madison.json'], ['reviews_cts.npz']],
+	'profiles': [['doc_topic.npy', 'reviews_Madison_extended.json']],
+	'predictor': [None],
+}
+
+# version of the code of each kind of stage; changing it invalidates the cached outputs of the stage (and of all stages that depend on it)
+VERSION = {'dictionary': 1, 'featurize': 1, 'lda': 1, 'profiles': 1, 'predictor': 1}
+
+def run_dictionary(params):
+	import Dictionary
+	Dictionary.main(params['size'])
+
+def run_featurize(params):
+	import LDA
+	LDA.setting(n_jobs=params.get('n_jobs', 1))
+
+def run_lda(params):
+	import LDA
+	LDA.fit_lda(params['K'], params['N_iter'], LDA.load_counts(), random_state=params['random_state'])
+
+def run_profiles(params):
+	import TrainingTestSet
+	TrainingTestSet.main(params['time_start'], params['time_end'])
+
+def run_predictor(params):
+	from dates import DateIndex
+	from evaluation import evaluate
+	context = get_context()
+	window = context.window(params['time_start'], params['time_end'], DateIndex.load(context.path('date_index.npz')).last())
+	result = evaluate(window.piglets, window.store, window.index, params['p'])
+	with open(context.path('results.json'), 'w') as fp:
+		json.dump({'prediction_error': result[0], 'average_error': result[1], 'N': result[2], 'params': params}, fp)
+
+RUN = {'dictionary': run_dictionary, 'featurize': run_featurize, 'lda': run_lda, 'profiles': run_profiles, 'predictor': run_predictor}
+
+def dictionary_size(size):
+	""" the size of the dictionary (see Dictionary.main) in a normal form, so that e.g. '1000', 1000 and 1000.0 give the same hash: a number of
+	words (int), a proportion below 1 (float) or 'elbow' """
+	if size == 'elbow':
+		return size
+	size = float(size)
+	return size if size < 1 else int(size)
+
+def graph(size=1000, K=20, N_iter=500, random_state=1, windows=(('2005-03-03', '2013-07-16'),), ps=(1,)):
+	""" the stages of the pipeline for the given parameters as a dictionary from the name of each stage to its kind, parameters and the names of the
+	stages it depends on (in the order of INPUTS[kind]) """
+	# the parameters are normalized, so that the same configuration has the same hashes whether it is given on the command line or in python
+	nodes = {}
+	nodes['dictionary'] = {'kind': 'dictionary', 'params': {'size': dictionary_size(size)}, 'after': ['source']}
+	nodes['featurize'] = {'kind': 'featurize', 'params': {}, 'after': ['source', 'dictionary']}
+	nodes['lda'] = {'kind': 'lda', 'params': {'K': int(K), 'N_iter': int(N_iter), 'random_state': int(random_state)}, 'after': ['source', 'featurize']}
+	for time_start, time_end in windows:
+		window = {'time_start': str(time_start), 'time_end': str(time_end)}
+		profiles = 'profiles_{}_{}'.format(time_start, time_end)
+		nodes[profiles] = {'kind': 'profiles', 'params': window, 'after': ['lda']}
+		for p in ps:
+			p = float(p)
+			nodes['predictor_{}_{}_p{:g}'.format(time_start, time_end, p)] = {'kind': 'predictor', 'params': dict(window, p=p), 'after': [profiles]}
+	return nodes
+
+def keys(nodes, source):
+	""" the hash of each stage, computed from the hashes of the stages it depends on and its parameters; source is the hash of the review data """
+	result = {'source': source}
+	while len(result) < len(nodes) + 1:
+		for name, node in nodes.items():
+			if name not in result and all(a in result for a in node['after']):
+				result[name] = digest('pipeline', VERSION[node['kind']], node['kind'], node['params'], [result[a] for a in node['after']])
+	return result
+
+def link(source, target):
+	""" makes the file (or folder) source available as target """
+	if os.path.lexists(target):
+		os.remove(target)
+	try:
+		os.symlink(os.path.abspath(source), target)
+	except (AttributeError, OSError):
+		shutil.copy(source, target)
+
+def run_node(job):
+	""" runs one stage in its artifact folder; job contains the name, kind and parameters of the stage, its artifact folder and the files to link
+	into it; returns the name of the stage and an error message (None if the stage succeeded) """
+	name, kind, params, folder, links = job
+	from context import set_directory
+	from instrument import Stage
+	directory_default = os.getcwd()
+	data_directory = get_context().directory
+	try:
+		for source, target in links:
+			link(source, os.path.join(folder, target))
+		set_directory(folder)
+		with Stage('pipeline.' + kind, unit='stages', items=1, node=name):
+			RUN[kind](params)
+		return name, None
+	except Exception as e:
+		return name, '{}: {}'.format(type(e).__name__, e)
+	finally:
+		set_directory(data_directory)
+		os.chdir(directory_default)
+
+def run(nodes, n_jobs=1, cache='pipeline_cache', force=()):
+	""" runs the stages in nodes (see graph) whose outputs are not cached yet, as soon as the stages they depend on are done, using n_jobs processes;
+	the stages in force are recomputed even if they are cached; returns a dictionary from the name of each stage to its artifact folder """
+	context = get_context()
+	cache = ArtifactCache(os.path.join(context.directory, cache))
+	source = context.path('reviews_Madison.json')
+	hashes = keys(nodes, file_digest(source))
+	folders = dict((name, cache.path(hashes[name])) for name in nodes)
+	folders['source'] = context.directory
+
+	done = set(['source'])
+	for name in nodes:
+		if cache.has(hashes[name]) and name not in force:
+			print('{}: cached ({})'.format(name, hashes[name][:10]))
+			done.add(name)
+
+	pool = multiprocessing.Pool(n_jobs) if n_jobs > 1 else None
+	finished = []
+	running = set()
+	try:
+		while len(done) < len(nodes) + 1:
+			# we start all stages whose dependencies are done
+			for name, node in sorted(nodes.items()):
+				if name in done or name in running or not all(a in done for a in node['after']):
+					continue
+				job = (name, node['kind'], node['params'], cache.open(hashes[name]), inputs(node, folders))
+				print('{}: running ({})'.format(name, hashes[name][:10]))
+				sys.stdout.flush()
+				running.add(name)
+				if pool is None:
+					finished.append(run_node(job))
+				else:
+					# failures outside of run_node (e.g. a job that cannot be sent to the worker) are reported by error_callback
+					pool.apply_async(run_node, (job,), callback=finished.append,
+						error_callback=lambda e, name=name: finished.append((name, '{}: {}'.format(type(e).__name__, e))))
+			if not running:
+				raise RuntimeError('the stages {} depend on stages that are missing'.format(sorted(set(nodes) - done)))
+			# we wait for at least one of the running stages to finish
+			while not finished:
+				time.sleep(0.05)
+			while finished:
+				name, error = finished.pop()
+				running.discard(name)
+				if error is not None:
+					raise RuntimeError('stage {} failed: {}'.format(name, error))
+				cache.commit(hashes[name])
+				done.add(name)
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+	del folders['source']
+	return folders
+
+def inputs(node, folders):
+	""" the pairs of files of the stages that node depends on and the names they are linked to in the folder of node """
+	links = []
+	for after, names in zip(node['after'], INPUTS[node['kind']]):
+		if names is None:
+			# all outputs of the stage
+			names = [f for f in os.listdir(folders[after]) if not f.startswith('.')]
+		for n in names:
+			links.append((os.path.join(folders[after], n), n))
+	return links
+
+def publish(folders):
+	""" copies the outputs of all stages to the data folder """
+	directory = get_context().directory
+	for name, folder in sorted(folders.items()):
+		for n in os.listdir(folder):
+			path = os.path.join(folder, n)
+			if n.startswith('.') or os.path.islink(path) or n == 'results.json':
+				continue
+			shutil.copy(path, os.path.join(directory, n))
+	get_context().clear()
+
+def main():
+	parser = argparse.ArgumentParser(description='runs the pipeline, recomputing only the stages whose inputs or parameters changed')
+	parser.add_argument('--size', default='1000')
+	parser.add_argument('--K', type=int, default=20)
+	parser.add_argument('--N_iter', type=int, default=500)
+	parser.add_argument('--random_state', type=int, default=1)
+	parser.add_argument('--windows', nargs='+', default=['2005-03-03:2013-07-16'])
+	parser.add_argument('--p', type=float, nargs='+', default=[1.])
+	parser.add_argument('--jobs', type=int, default=1)
+	parser.add_argument('--cache', default='pipeline_cache')
+	parser.add_argument('--force', nargs='*', default=[])
+	parser.add_argument('--publish', action='store_true')
+	args = parser.parse_args()
+	windows = [tuple(w.split(':')) for w in args.windows]
+	nodes = graph(args.size, args.K, args.N_iter, args.random_state, windows, args.p)
+	folders = run(nodes, args.jobs, args.cache, args.force)
+	for name in sorted(folders):
+		if nodes[name]['kind'] == 'predictor':
+			with open(os.path.join(folders[name], 'results.json')) as fp:
+				result = json.load(fp)
+			print('{}: N = {}, prediction error {:.4f}, average error {:.4f}'.format(name, result['N'], result['prediction_error'], result['average_error']))
+	if args.publish:
+		publish(folders)
+
+if __name__ == '__main__':	main()
@@ -9,81 +9,53 @@
 # as the number of topics used in or LDA could be varied and lead to improvements (experimentation shows that this is likely to make a difference)
 
 # import required packages
-import os, json, math
-
-# change working directory
-directory_default = os.getcwd()
-user = os.environ['HOME']
-directory = user  + '/Dropbox/REVIEWS_CODES/Final_Code/Yelp_Data_Set/Data_Sets_Madison'
-os.chdir(directory)
-
-# we load the training data set as well as the business and costumer profiles we obtained for that set as well as the set of test costumers (piglets)
-with open('reviews_Madison_training_2005-03-03_2013-07-16.json') as fp:
-	data_training = json.load(fp)
-
-with open('costumer_profiles_training_2005-03-03_2013-07-16.json') as fp:
-	costumer_profiles_training = json.load(fp)
-
-with open('costumer_ids_training_2005-03-03_2013-07-16.json') as fp:
-	costumer_ids_training = json.load(fp)
-
-with open('business_profiles_training_2005-03-03_2013-07-16.json') as fp:
-	business_profiles_training = json.load(fp)
-
-with open('business_ids_training_2005-03-03_2013-07-16.json') as fp:
-	business_ids_training = json.load(fp)
-
-with open('piglets_2013-07-16_2014-07-16.json') as fp:
-	piglets = json.load(fp)
-
-# we define classes for businesses and costumers based on their profiles
-class Business:
-	def __init__(self,i):
-		self.id = business_profiles_training[i]['id']
-		self.costumers = business_profiles_training[i]['costumer_ids']
-		self.rating = business_profiles_training[i]['rating']
-		self.no_reviews = business_profiles_training[i]['no_reviews']
-		self.review_ids = business_profiles_training[i]['review_ids']
-
-class Costumer:
-	def __init__(self,i):
-		self.id = costumer_profiles_training[i]['id']
-		self.no_reviews = costumer_profiles_training[i]['no.reviews']
-		self.dist = costumer_profiles_training[i]['dist']
-		self.review_ids = costumer_profiles_training[i]['review_ids']
-		self.businesses = costumer_profiles_training[i]['businesses']
-		self.index = i
-
-# we define functions that allow us to work with classes either using their ids or indices in the training set
+import math
+import numpy as np
+from divergence import js_distances
+from evaluation import evaluate
+from context import get_context
+from instrument import Stage
+
+# we use the training data set from 2005-03-03 to 2013-07-16 as well as the business and costumer profiles we obtained for that set (held in a profile 
+# store, see profiles.py), its ratings indexed by costumer and business (see ratings.py) and the set of test costumers (piglets) from 2013-07-16 to
+# 2014-07-16; these are loaded from the data folder the first time they are used, and shared with other modules (see context.py)
+time_start = '2005-03-03'
+time_end = '2013-07-16'
+time_last = '2014-07-16'
+
+def window():
+	""" the training set and piglets used for the predictions """
+	return get_context().window(time_start, time_end, time_last)
+
+# we define functions that allow us to work with businesses and costumers either using their ids or indices in the training set
+def Business(i):
+	""" the business with index i in the training set """
+	return window().store.business(i)
+
+def Costumer(i):
+	""" the costumer with index i in the training set """
+	return window().store.costumer(i)
+
 def costumer_map(id):
 	""" takes a costumer id and returns the index of the corresponding profile in the costumer training set """
-	for i in range(0,len(costumer_profiles_training)):
-		if costumer_profiles_training[i]['id'] == id:
-			return i
+	return window().store.costumer_map(id)
 
 def costumer_map_inverse(n):
 	""" inverse of costumer_map """
-	return costumer_profiles_training[n]['id']
+	return window().store.costumer_profiles[n]['id']
 
 def business_map(id):
 	""" takes a business id and returns the index of the corresponding profile in the business training set """
-	for i in range(0,len(business_profiles_training)):
-		if business_profiles_training[i]['id'] == id:
-			return i
+	return window().store.business_map(id)
 
 def business_map_inverse(n):
 	""" inverse of business_map """
-	return business_profiles_training[n]['id']
+	return window().store.business_profiles[n]['id']
 
 # we now define the functions required for the prediction
 def rating(user,business):
 	""" computes the average rating that costumer "user" has given a restaurant "business" """
-	which = [ob for ob in data_training if (ob['user_id']==user.id and ob['business_id'] == business.id)]
-	if len(which) >0:
-		stars = [w['stars'] for w in which]
-		return (sum(stars)/float(len(stars)))
-	else:
-		return('NA')
+	return window().index.mean(user.id, business.id)
 
 def KL(P,Q):
 	""" Kullbach-Leibler divergence between distributions P and Q """
@@ -107,16 +79,20 @@ def JS(x1,x2):
 	S = KL(x1.dist,M) + KL(x2.dist,M)
 	return(float(S)/2)
 
-def pred_rating(user,business,p):
+def pred_rating(user,business,p,k=None):
 	""" computes the JS metric between a user and all costumer that reviewed business and returns the reweighted
-	 average rating of their reviews as the prediction for this user; the weightings can be varied using power p """
-	weights = [Costumer(costumer_map(x)) for x in business.costumers]
-	weights = [pow((1-JS(user,x)),p) for x in weights]
-	ww = sum(weights)
-	weights = [x/float(ww) for x in weights]
-	ratings = [rating(Costumer(costumer_map(x)),business) for x in business.costumers]
-	pred = [ratings[i] * weights[i] for i in range(len(weights))]
-	return(sum(pred))
+	 average rating of their reviews as the prediction for this user; the weightings can be varied using power p; if k is given, only the k 
+	 reviewers most similar to user are used for businesses with many reviewers (see neighbours.py) """
+	# the costumers that reviewed business and their ratings are looked up in the rating index, and the JS distances between user and all 
+	# these costumers are computed in one call (see divergence.py)
+	if k is None:
+		rows, ratings = window().index.reviewers(business.index)
+	else:
+		pos = window().neighbours().nearest(user.index, business.index, k)
+		rows, ratings = window().index.rows[pos], window().index.values[pos]
+	weights = pow(1 - js_distances(user.dist, window().store.dists[rows]), p)
+	weights = weights / weights.sum()
+	return(float(np.dot(ratings, weights)))
 
 # we implement functions that quickly give predictions for each of our piglets
 # NOTE: so far, every business a piglet reviewed in the testing interval (and which occurs in the training interval) is considered; 
@@ -125,12 +101,14 @@ def pred_rating(user,business,p):
 def piglet_prediction(n,p=1):
 	""" computes tuples containing the predicted, average rating and true rating (that is what the piglet's actual score 
 		for a restaurant was) for each business he/she reviewed; power in the JS metric can be specified """
-		pig = Costumer(costumer_map(piglets[n]['id']))
-		businesses = [Business(business_map(x)) for x in piglets[n]['test_restaurants'] if x in business_ids_training]
-		average_rating = [business.rating for business in businesses]
-		true_ratings = [piglets[n]['test_restaurants_rating'][i] for i in range(0,len(piglets[n]['test_restaurants'])) if piglets[n]['test_restaurants'][i] in business_ids_training]
-		predictions = [pred_rating(pig,business,p) for business in businesses]
-		return zip(predictions,average_rating,true_ratings)
+	piglets = window().piglets
+	business_index = window().store.business_index
+	pig = Costumer(costumer_map(piglets[n]['id']))
+	businesses = [Business(business_map(x)) for x in piglets[n]['test_restaurants'] if x in business_index]
+	average_rating = [business.rating for business in businesses]
+	true_ratings = [piglets[n]['test_restaurants_rating'][i] for i in range(0,len(piglets[n]['test_restaurants'])) if piglets[n]['test_restaurants'][i] in business_index]
+	predictions = [pred_rating(pig,business,p) for business in businesses]
+	return list(zip(predictions,average_rating,true_ratings))
 
 def piglet_performance(j,p=1):
 	""" returns the total differences in rating between the predicted rating and the actual rating and the average rating and the actual rating for piglet j
@@ -141,15 +119,13 @@ def piglet_performance(j,p=1):
 	s_average = sum([abs(measures[i][2]-measures[i][1]) for i in range(0,n)])
 	return [s_prediction,s_average,n]
 
-def piglet_performance_total(p):
-	""" evaluates the average peformance of our prediction method over all piglets and compares them with the average performance of simply taking the average rating """
-	N = 0
-	S_prediction = 0
-	S_average = 0
-	for i in range(0,len(piglets)):
-		[s_prediction,s_average,n] = piglet_performance(i,p)
-		N = N + n
-		S_prediction = S_prediction + s_prediction
-		S_average = S_average + s_average
-		print i
-	return [S_prediction/float(N),S_average/float(N),N]
\ No newline at end of file
+def piglet_performance_total(p,k=None):
+	""" evaluates the average peformance of our prediction method over all piglets and compares them with the average performance of simply taking the average rating;
+	all predictions are computed in one batch (see evaluation.py); k optionally restricts the predictions to the k most similar reviewers (see pred_rating) """
+	with Stage('predictor.evaluate', unit='predictions', p=p, k=k) as stage:
+		if k is None:
+			result = evaluate(window().piglets, window().store, window().index, p)
+		else:
+			result = evaluate(window().piglets, window().store, window().index, p, neighbours=window().neighbours(), k=k)
+		stage.count(result[2])
+	return result
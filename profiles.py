@@ -0,0 +1,163 @@
+# This file implements a store for the costumer and business profiles of a training set (as computed by TrainingTestSet.py) that is used by predictor.py.
+# The profiles are loaded once; ids are mapped to the index of the corresponding profile by dictionaries (rather than by scanning the list of profiles),
+# and the topic distributions of all costumers are held in one contiguous (number of costumers x K) array, so that the distributions of many costumers
+# can be selected at once. Business and Costumer are light views of one profile in the store.
+# The topic distributions themselves are the means of the topic loadings of the reviews of each costumer; they are computed for all costumers at once
+# by a single reduction over the reviews grouped by costumer (see mean_profiles and UserIndex), optionally weighing recent reviews more.
+
+# we load required packages
+import os, json
+import numpy as np
+
+class ProfileStore:
+	def __init__(self, costumer_profiles, business_profiles, dists=None):
+		""" costumer_profiles and business_profiles are the lists of profiles as computed by TrainingTestSet.py; dists optionally replaces the topic 
+		distributions of the costumer profiles (e.g. when the distributions are recomputed for a different LDA) """
+		self.costumer_profiles = costumer_profiles
+		self.business_profiles = business_profiles
+		self.costumer_index = dict((costumer_profiles[i]['id'], i) for i in range(0,len(costumer_profiles)))
+		self.business_index = dict((business_profiles[i]['id'], i) for i in range(0,len(business_profiles)))
+		if dists is None:
+			dists = [c['dist'] for c in costumer_profiles]
+		self.dists = np.array(dists, dtype=np.float64)
+		self.business_ratings = np.array([b['rating'] for b in business_profiles], dtype=np.float64)
+
+	@classmethod
+	def load(cls, directory, time_start, time_end):
+		""" loads the costumer and business profiles of the training set from time_start to time_end stored in directory """
+		with open(os.path.join(directory, 'costumer_profiles_training_' + time_start + '_' + time_end + '.json')) as fp:
+			costumer_profiles = json.load(fp)
+		with open(os.path.join(directory, 'business_profiles_training_' + time_start + '_' + time_end + '.json')) as fp:
+			business_profiles = json.load(fp)
+		return cls(costumer_profiles, business_profiles)
+
+	def costumer_map(self, id):
+		""" takes a costumer id and returns the index of the corresponding profile (None if there is no such costumer) """
+		return self.costumer_index.get(id)
+
+	def business_map(self, id):
+		""" takes a business id and returns the index of the corresponding profile (None if there is no such business) """
+		return self.business_index.get(id)
+
+	def costumer(self, i):
+		return Costumer(self, i)
+
+	def business(self, i):
+		return Business(self, i)
+
+def group_rows(keys):
+	""" groups the indices of the list keys by their value; returns a dictionary that maps each value to the list of its indices (in order) """
+	groups = {}
+	for i in range(0,len(keys)):
+		groups.setdefault(keys[i], []).append(i)
+	return groups
+
+def mean_profiles(groups, doc_topic, weights=None):
+	""" topic distributions of costumers, i.e. the mean of the topic loadings doc_topic of the reviews of each costumer, for each (non-empty) list of
+	review indices in groups at once; weights optionally weighs the reviews (e.g. by recency, see recency_weights) """
+	n = np.array([len(g) for g in groups], dtype=np.int64)
+	rows = np.array([i for g in groups for i in g], dtype=np.int64)
+	return grouped_means(rows, np.cumsum(n) - n, doc_topic, weights)
+
+def grouped_means(rows, starts, doc_topic, weights=None):
+	""" (weighted) means of the topic loadings of the reviews rows[starts[j]:starts[j+1]] for each group j, using a single reduction over rows """
+	doc_topic = np.asarray(doc_topic, dtype=np.float64)
+	if len(starts) == 0:
+		return np.zeros((0, doc_topic.shape[1]))
+	if weights is None:
+		w = np.ones(len(rows))
+	else:
+		w = np.asarray(weights, dtype=np.float64)[rows]
+	total = np.add.reduceat(doc_topic[rows] * w[:, np.newaxis], starts, axis=0)
+	return total / np.add.reduceat(w, starts)[:, np.newaxis]
+
+def recency_weights(dates, half_life, time_end=None):
+	""" weights of the reviews posted at dates (in the format '2011-01-01') that halve every half_life days before time_end (the date of the last 
+	review by default) """
+	days = np.array([d[:10] for d in dates], dtype='datetime64[D]')
+	end = np.datetime64(time_end[:10], 'D') if time_end is not None else days.max()
+	return np.power(0.5, (end - days).astype(np.float64) / half_life)
+
+class UserIndex:
+	def __init__(self, user_ids):
+		""" index of the reviews by costumer, where user_ids are the user ids of the reviews; users are the distinct ids in order of their first 
+		review, and the reviews of the costumer users[j] are order[starts[j]:starts[j+1]] """
+		codes = {}
+		user_codes = np.array([codes.setdefault(id, len(codes)) for id in user_ids], dtype=np.int64)
+		self.users = [None] * len(codes)
+		for id, code in codes.items():
+			self.users[code] = id
+		self.codes = codes
+		self.order = np.argsort(user_codes, kind='mergesort')
+		counts = np.bincount(user_codes, minlength=len(codes))
+		self.starts = np.cumsum(counts) - counts
+		self.counts = counts
+
+	def lookup(self, ids):
+		""" codes of the user ids (a KeyError is raised for unknown ids) """
+		return np.array([self.codes[id] for id in ids], dtype=np.int64)
+
+	def rows(self, id):
+		""" indices of the reviews of the costumer id, in order """
+		j = self.codes[id]
+		return self.order[self.starts[j]:self.starts[j] + self.counts[j]]
+
+	def profiles(self, doc_topic, weights=None):
+		""" (number of users x K) array of the topic distributions of all users (see mean_profiles) """
+		return grouped_means(self.order, self.starts, doc_topic, weights)
+
+# we define classes for businesses and costumers based on their profiles in the store
+class Business(object):
+	__slots__ = ('store', 'index')
+
+	def __init__(self, store, i):
+		self.store = store
+		self.index = i
+
+	@property
+	def id(self):
+		return self.store.business_profiles[self.index]['id']
+
+	@property
+	def costumers(self):
+		return self.store.business_profiles[self.index]['costumer_ids']
+
+	@property
+	def rating(self):
+		return self.store.business_profiles[self.index]['rating']
+
+	@property
+	def no_reviews(self):
+		return self.store.business_profiles[self.index]['no_reviews']
+
+	@property
+	def review_ids(self):
+		return self.store.business_profiles[self.index]['review_ids']
+
+class Costumer(object):
+	__slots__ = ('store', 'index')
+
+	def __init__(self, store, i):
+		self.store = store
+		self.index = i
+
+	@property
+	def id(self):
+		return self.store.costumer_profiles[self.index]['id']
+
+	@property
+	def no_reviews(self):
+		return self.store.costumer_profiles[self.index]['no.reviews']
+
+	@property
+	def dist(self):
+		""" the topic distribution of the costumer (a row of the store's array of distributions) """
+		return self.store.dists[self.index]
+
+	@property
+	def review_ids(self):
+		return self.store.costumer_profiles[self.index]['review_ids']
+
+	@property
+	def businesses(self):
+		return self.store.costumer_profiles[self.index]['businesses']
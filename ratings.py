@@ -0,0 +1,42 @@
+# This file implements an index of the ratings in a training set that is used by predictor.py; it is built once from the training reviews and maps each
+# pair of costumer and business ids to the sum and number of the ratings the costumer gave the business. In addition, for each business in a profile
+# store (see profiles.py) the indices of the costumers that reviewed it and their average ratings are stored in two flat arrays (in the order of the
+# costumer_ids of the business profile), so that the reviewers of a business and their ratings are available as arrays without scanning the reviews.
+
+# we load required packages
+import numpy as np
+
+class RatingIndex:
+	def __init__(self, reviews, store):
+		""" reviews is the list of training reviews and store the profile store of the same training set """
+		self.sums = {}
+		self.counts = {}
+		for review in reviews:
+			key = (review['user_id'], review['business_id'])
+			self.sums[key] = self.sums.get(key, 0) + review['stars']
+			self.counts[key] = self.counts.get(key, 0) + 1
+
+		# the reviewers of business b are rows[indptr[b]:indptr[b+1]], their average ratings of b are values[indptr[b]:indptr[b+1]]
+		indptr = [0]
+		rows = []
+		values = []
+		for profile in store.business_profiles:
+			for x in profile['costumer_ids']:
+				rows.append(store.costumer_index[x])
+				values.append(self.mean(x, profile['id']))
+			indptr.append(len(rows))
+		self.indptr = np.array(indptr, dtype=np.int64)
+		self.rows = np.array(rows, dtype=np.int64)
+		self.values = np.array(values, dtype=np.float64)
+
+	def mean(self, user_id, business_id):
+		""" the average rating costumer user_id has given business business_id, or 'NA' if there is no such review """
+		key = (user_id, business_id)
+		if key in self.counts:
+			return self.sums[key] / float(self.counts[key])
+		else:
+			return('NA')
+
+	def reviewers(self, b):
+		""" the indices of the costumers that reviewed the business with index b in the profile store and their average ratings of it """
+		return self.rows[self.indptr[b]:self.indptr[b+1]], self.values[self.indptr[b]:self.indptr[b+1]]
@@ -0,0 +1,49 @@
+# This file contains helpers to read the yelp review data incrementally; instead of loading the whole .json file with json.load (which holds every
+# review dict in memory at once), the reviews are decoded one at a time from a buffered stream, so that memory use does not grow with the size of
+# the review file. Both the json array format used for reviews_Madison.json and the one-review-per-line format of the original yelp dump are supported.
+
+# we load required packages
+import io, json
+
+def iter_reviews(path, chunk_size=1 << 20):
+	""" yields the reviews stored in the .json file at path one by one; the file is read in chunks of chunk_size characters """
+	decoder = json.JSONDecoder()
+	with io.open(path, encoding='utf-8') as fp:
+		buf = fp.read(chunk_size)
+		eof = len(buf) == 0
+		pos = 0
+		opened = False
+		while True:
+			# we skip whitespace and separators between reviews
+			while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','):
+				pos += 1
+			if pos < len(buf) and buf[pos] == '[' and not opened:
+				opened = True
+				pos += 1
+				continue
+			if pos < len(buf) and buf[pos] == ']':
+				return
+			if pos == len(buf):
+				if eof:
+					return
+				buf = fp.read(chunk_size)
+				eof = len(buf) == 0
+				pos = 0
+				continue
+			try:
+				review, end = decoder.raw_decode(buf, pos)
+			except ValueError:
+				# the current review is cut off at the end of the buffer; we read the next chunk and try again
+				if eof:
+					raise
+				more = fp.read(chunk_size)
+				eof = len(more) == 0
+				buf = buf[pos:] + more
+				pos = 0
+				continue
+			yield review
+			pos = end
+			# we drop the part of the buffer that has already been decoded
+			if pos > chunk_size:
+				buf = buf[pos:]
+				pos = 0
@@ -0,0 +1,211 @@
+# This file implements a local prediction server: the profile store, the rating index and the topic model of a training window are loaded once when
+# the server starts (see context.py), and the server then answers batch requests for the predicted ratings of one costumer for a list of businesses
+# over HTTP, with the predictions computed as in evaluation.py. The predictions of recent (costumer, business) pairs are kept in an LRU cache, which
+# is emptied when a new training window is published to the server. Costumers that are not in the training window can be served by sending the texts
+# of their reviews, from which their topic distribution is inferred with the topic model (see inference.py).
+
+# the server is started using the command
+#	python server.py --port 8000 --start 2005-03-03 --end 2013-07-16 --last 2014-07-16
+# and answers the requests
+#	POST /predict	{"user_id": "...", "business_ids": ["...", ...], "p": 1, "k": null, "texts": null}
+#	POST /publish	{"time_start": "2005-03-03", "time_end": "2014-07-16", "time_last": "2015-07-16"}
+#	GET /stats
+
+# we load required packages
+import json, time, errno, threading, argparse
+from collections import OrderedDict, deque
+import numpy as np
+from context import get_context
+from evaluation import predict, predict_dist
+
+try:
+	from http.server import HTTPServer, BaseHTTPRequestHandler
+	from socketserver import ThreadingMixIn
+except ImportError:
+	from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+	from SocketServer import ThreadingMixIn
+
+class LRUCache:
+	def __init__(self, capacity):
+		""" cache of at most capacity entries, of which the least recently used one is dropped first """
+		self.capacity = capacity
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key):
+		""" the cached value of key, or None """
+		if key not in self.entries:
+			self.misses = self.misses + 1
+			return None
+		value = self.entries.pop(key)
+		self.entries[key] = value
+		self.hits = self.hits + 1
+		return value
+
+	def put(self, key, value):
+		self.entries.pop(key, None)
+		self.entries[key] = value
+		if len(self.entries) > self.capacity:
+			self.entries.popitem(last=False)
+
+	def clear(self):
+		self.entries.clear()
+
+	def __len__(self):
+		return len(self.entries)
+
+class PredictionService:
+	def __init__(self, time_start, time_end, time_last, cache_size=100000, n_latencies=10000):
+		""" serves the predictions of the training window from time_start to time_end (and time_last, the end of its test set); the predictions of
+		at most cache_size pairs are cached, and the latencies of the last n_latencies requests are kept for the statistics """
+		self.lock = threading.Lock()
+		self.cache = LRUCache(cache_size)
+		self.latencies = deque(maxlen=n_latencies)
+		self.requests = 0
+		self.generation = 0
+		self.model = None
+		self.publish(time_start, time_end, time_last)
+
+	def publish(self, time_start, time_end, time_last):
+		""" loads the training window from time_start to time_end and serves its predictions from now on; the cached predictions of the previous
+		window are dropped; the window and the topic model are read from disk again, even if a window with the same dates has been served before
+		(the LDA may have been refitted in the meantime, e.g. by pipeline.py --publish) """
+		from inference import TopicInference
+		context = get_context()
+		context.forget_window(time_start, time_end, time_last)
+		context.forget('topic_word.npy', 'dictionary.txt')
+		window = context.window(time_start, time_end, time_last)
+		# everything is loaded before the window is swapped in, so that requests are never served from a partially loaded window
+		window.store
+		window.index
+		model = TopicInference(context.topic_word, context.vocab)
+		with self.lock:
+			self.window = window
+			self.model = model
+			self.generation = self.generation + 1
+			self.cache.clear()
+
+	def predict(self, user_id, business_ids, p=1, k=None, texts=None):
+		""" the predicted ratings of costumer user_id for the businesses business_ids (None for businesses that are not in the training window);
+		texts are the texts of reviews of the costumer, which are only used if the costumer is not in the training window """
+		t = time.time()
+		with self.lock:
+			window = self.window
+			model = self.model
+			generation = self.generation
+		store = window.store
+		b = [store.business_index.get(x) for x in business_ids]
+		u = store.costumer_index.get(user_id)
+		if u is None and not texts:
+			raise KeyError('unknown costumer {}'.format(user_id))
+
+		predictions = [None] * len(business_ids)
+		missing = []
+		for j in range(0,len(business_ids)):
+			if b[j] is None:
+				continue
+			if u is None:
+				missing.append(j)
+				continue
+			with self.lock:
+				value = self.cache.get((user_id, business_ids[j], p, k))
+			if value is None:
+				missing.append(j)
+			else:
+				predictions[j] = value
+
+		if missing:
+			businesses = np.array([b[j] for j in missing], dtype=np.int64)
+			if u is None:
+				values = predict_dist(model.transform(texts).mean(0), businesses, store, window.index, p)
+			else:
+				neighbours = window.neighbours() if k is not None else None
+				values = predict(np.repeat(u, len(missing)), businesses, store, window.index, p, neighbours=neighbours, k=k)
+			with self.lock:
+				for j, value in zip(missing, values):
+					predictions[j] = float(value)
+					# predictions of a window that has been replaced in the meantime are not cached
+					if u is not None and generation == self.generation:
+						self.cache.put((user_id, business_ids[j], p, k), float(value))
+
+		with self.lock:
+			self.latencies.append(time.time() - t)
+			self.requests = self.requests + 1
+		return predictions
+
+	def stats(self):
+		""" the number of requests, the 50th, 90th and 99th percentile of their latencies (in milliseconds) and the cache statistics """
+		with self.lock:
+			latencies = np.array(self.latencies) * 1000
+			stats = {'requests': self.requests, 'cache_size': len(self.cache), 'cache_hits': self.cache.hits, 'cache_misses': self.cache.misses,
+				'window': [self.window.time_start, self.window.time_end, self.window.time_last]}
+		for q in (50, 90, 99):
+			stats['p{}_ms'.format(q)] = float(np.percentile(latencies, q)) if len(latencies) else None
+		return stats
+
+class Handler(BaseHTTPRequestHandler):
+	# the prediction service is set by serve()
+	service = None
+
+	def reply(self, code, body):
+		data = json.dumps(body).encode('utf8')
+		self.send_response(code)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def do_GET(self):
+		if self.path == '/stats':
+			self.reply(200, self.service.stats())
+		else:
+			self.reply(404, {'error': 'unknown path {}'.format(self.path)})
+
+	def do_POST(self):
+		try:
+			request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf8'))
+			if self.path == '/predict':
+				predictions = self.service.predict(request['user_id'], request['business_ids'], request.get('p', 1), request.get('k'), request.get('texts'))
+				self.reply(200, {'user_id': request['user_id'], 'business_ids': request['business_ids'], 'predictions': predictions})
+			elif self.path == '/publish':
+				self.service.publish(request['time_start'], request['time_end'], request['time_last'])
+				self.reply(200, self.service.stats())
+			else:
+				self.reply(404, {'error': 'unknown path {}'.format(self.path)})
+		except (KeyError, ValueError, TypeError) as e:
+			self.reply(400, {'error': str(e)})
+		except (IOError, OSError) as e:
+			# the files of a published window (or of the topic model) are missing or cannot be read
+			self.reply(404 if getattr(e, 'errno', None) == errno.ENOENT else 500, {'error': str(e)})
+
+	def log_message(self, format, *args):
+		pass
+
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+
+def serve(service, host='127.0.0.1', port=8000):
+	""" answers the requests to service over HTTP until interrupted """
+	Handler.service = service
+	server = ThreadedHTTPServer((host, port), Handler)
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	server.server_close()
+
+def main():
+	parser = argparse.ArgumentParser(description='prediction server')
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8000)
+	parser.add_argument('--start', default='2005-03-03')
+	parser.add_argument('--end', default='2013-07-16')
+	parser.add_argument('--last', default='2014-07-16')
+	parser.add_argument('--cache-size', type=int, default=100000)
+	args = parser.parse_args()
+	service = PredictionService(args.start, args.end, args.last, args.cache_size)
+	print('serving the training window {} to {} on {}:{}'.format(args.start, args.end, args.host, args.port))
+	serve(service, args.host, args.port)
+
+if __name__ == '__main__':	main()
@@ -0,0 +1,98 @@
+# This file runs a sweep over the parameters of our prediction method (see the NOTE in predictor.py): the number of topics K and the number of
+# iterations N_iter of the LDA, and the power p used in reweighting the reviews. For each pair (K, N_iter) the LDA is fitted once on the bag of words
+# representation of the reviews (reviews_cts.npz, see LDA.setting()), and the costumer profiles of the training set are recomputed from its document
+# loadings; every value of p is then evaluated on these profiles. The business profiles, the piglets and the rating index do not depend on the LDA and
+# are loaded once through the data context (see context.py) from the outputs of TrainingTestSet.py for the given dates and the end of the test set.
+# Both the LDA fits and the evaluations run on a pool of n_jobs processes, which share the (read-only) rating index and profiles (see workers.py).
+# The results are written to sweep_results.csv in the output folder.
+
+# the script is run using the command
+#	python sweep.py --K 10 20 40 --N_iter 500 --p 0.5 1 2 4 --start 2005-03-03 --end 2013-07-16 --last 2014-07-16 --jobs 8
+
+# we load required packages
+import os, csv, argparse
+import numpy as np
+from profiles import ProfileStore, group_rows, mean_profiles
+from evaluation import evaluate
+from columnar import field
+from context import get_context
+from workers import shared, run_pool
+
+def fit(config):
+	""" fits the LDA with K topics and N_iter iterations and saves its document loadings; returns the path of the saved loadings """
+	import lda
+	K, N_iter = config
+	model = lda.LDA(n_topics=K, n_iter=N_iter, random_state=1)
+	model.fit(shared['Y'])
+	path = os.path.join(shared['output'], 'doc_topic_K{}_N{}.npy'.format(K, N_iter))
+	np.save(path, model.doc_topic_)
+	return path
+
+def score(job):
+	""" evaluates the predictions for the profiles of fit number f and power p """
+	f, p = job
+	return evaluate(shared['piglets'], shared['stores'][f], shared['index'], p)
+
+def sweep(Ks, N_iters, ps, time_start, time_end, n_jobs=1, output='sweep', time_last=None):
+	""" evaluates our prediction method for the training set from time_start to time_end (and the test set from time_end to time_last, the date of
+	the last review by default) for each combination of the number of topics in Ks, the number of iterations in N_iters and the power in ps; returns
+	the rows of the results table """
+	from LDA import load_counts
+	from dates import DateIndex
+
+	context = get_context()
+	output = os.path.join(context.directory, output)
+	if not os.path.isdir(output):
+		os.makedirs(output)
+
+	# we fit the LDA for each pair of K and N_iter
+	shared['Y'] = load_counts()
+	shared['output'] = output
+	fits = [(K, N_iter) for K in Ks for N_iter in N_iters]
+	paths = run_pool(fit, fits, n_jobs)
+
+	# the profiles, rating index and piglets of the training set (see context.py)
+	if time_last is None:
+		time_last = DateIndex.load(context.path('date_index.npz')).last()
+	window = context.window(time_start, time_end, time_last)
+	base = window.store
+
+	# the profile of a costumer is computed from all of his/her reviews (see auxillary.profiles_for); we group the reviews by costumer
+	reviews_by_user = group_rows(field(context.Madison, 'user_id'))
+	groups = [reviews_by_user[c['id']] for c in base.costumer_profiles]
+
+	shared['Y'] = None
+	shared['piglets'] = window.piglets
+	shared['index'] = window.index
+	shared['stores'] = [ProfileStore(base.costumer_profiles, base.business_profiles, mean_profiles(groups, np.load(path))) for path in paths]
+
+	# we evaluate each fit for every p
+	jobs = [(f, p) for f in range(0,len(fits)) for p in ps]
+	results = run_pool(score, jobs, n_jobs)
+
+	rows = []
+	for (f, p), (s_prediction, s_average, n) in zip(jobs, results):
+		rows.append([fits[f][0], fits[f][1], p, s_prediction, s_average, n])
+
+	with open(os.path.join(output, 'sweep_results.csv'), 'w') as fp:
+		writer = csv.writer(fp)
+		writer.writerow(['K', 'N_iter', 'p', 'prediction_error', 'average_error', 'N'])
+		for row in rows:
+			writer.writerow(row)
+
+	return rows
+
+def main():
+	parser = argparse.ArgumentParser(description='parameter sweep over K, N_iter and p')
+	parser.add_argument('--K', type=int, nargs='+', required=True)
+	parser.add_argument('--N_iter', type=int, nargs='+', required=True)
+	parser.add_argument('--p', type=float, nargs='+', default=[1.])
+	parser.add_argument('--start', required=True)
+	parser.add_argument('--end', required=True)
+	parser.add_argument('--last', default=None)
+	parser.add_argument('--jobs', type=int, default=1)
+	parser.add_argument('--output', default='sweep')
+	args = parser.parse_args()
+	sweep(args.K, args.N_iter, args.p, args.start, args.end, args.jobs, args.output, args.last)
+
+if __name__ == '__main__':	main()
@@ -0,0 +1,101 @@
+# This file generates synthetic review data of the same shape as the yelp review data (reviews_Madison.json), so that the pipeline can be run and timed
+# without the private review data (see benchmark.py). The corpus is generated from a small topic model: each of n_topics topics is a Zipfian distribution
+# over a vocabulary of vocab_size made-up words (in a different order for each topic), each costumer has a Dirichlet distribution over the topics, and
+# each review mixes the topics of its costumer with the topic of its business. The number of reviews per costumer and per business follows a power law
+# (a few costumers and businesses account for most of the reviews, as in the yelp data), the dates are spread over the time interval with more reviews in
+# later years, and the star rating of a review is higher the closer the topics of the costumer are to the topic of the business.
+
+# the data is generated using the command
+#	python synthetic.py Data_Sets_Synthetic 100000
+# which writes Data_Sets_Synthetic/reviews_Madison.json
+
+# we load required packages
+import os, sys, json, datetime
+import numpy as np
+
+CONSONANTS = 'bcdfghjklmnprtvwz'
+VOWELS = 'aeiou'
+
+def make_vocab(vocab_size, random_state):
+	""" vocab_size distinct made-up words of two to four syllables (none ends in an 's', so that no word is taken for a plural) """
+	words = []
+	seen = set()
+	while len(words) < vocab_size:
+		n = random_state.randint(2, 5)
+		word = ''.join(CONSONANTS[random_state.randint(len(CONSONANTS))] + VOWELS[random_state.randint(len(VOWELS))] for i in range(0,n))
+		if word not in seen:
+			seen.add(word)
+			words.append(word)
+	return words
+
+def power_law(n, exponent, random_state):
+	""" activity weights of n costumers or businesses that follow a power law with the given exponent, in random order """
+	weights = 1. / np.arange(1, n + 1) ** exponent
+	random_state.shuffle(weights)
+	return weights / weights.sum()
+
+def generate(n_reviews, n_users=None, n_businesses=None, vocab_size=5000, n_topics=10, words_per_review=60, time_start='2005-01-01',
+	time_end='2014-12-31', seed=1, chunk_size=10000):
+	""" yields n_reviews synthetic reviews with the fields of the yelp data (review_id, user_id, business_id, stars, date and text); by default there
+	is one costumer per 4 reviews and one business per 40 reviews """
+	random_state = np.random.RandomState(seed)
+	n_users = n_users or max(n_reviews // 4, 1)
+	n_businesses = n_businesses or max(n_reviews // 40, 1)
+	vocab = np.array(make_vocab(vocab_size, random_state), dtype=object)
+
+	# the topics are Zipfian distributions over the vocabulary, each in a different order of the words
+	zipf = 1. / np.arange(1, vocab_size + 1) ** 1.1
+	topics = np.array([zipf[random_state.permutation(vocab_size)] for k in range(0,n_topics)])
+	topics = topics / topics.sum(1)[:, np.newaxis]
+	cumulative_topics = np.cumsum(topics, 1)
+	user_topics = random_state.dirichlet(np.repeat(0.3, n_topics), n_users)
+	business_topic = random_state.randint(n_topics, size=n_businesses)
+	user_weights = power_law(n_users, 1.0, random_state)
+	business_weights = power_law(n_businesses, 0.8, random_state)
+
+	# the reviews are dated with a density that increases linearly over the time interval
+	start = datetime.date(*map(int, time_start.split('-')))
+	days = (datetime.date(*map(int, time_end.split('-'))) - start).days
+
+	for offset in range(0, n_reviews, chunk_size):
+		n = min(chunk_size, n_reviews - offset)
+		users = random_state.choice(n_users, size=n, p=user_weights)
+		businesses = random_state.choice(n_businesses, size=n, p=business_weights)
+		dates = np.sqrt(random_state.random_sample(n)) * days
+		match = user_topics[users, business_topic[businesses]]
+		stars = np.clip(np.round(2 + 3.5 * np.sqrt(match) + random_state.normal(0, 0.8, n)), 1, 5).astype(int)
+		lengths = random_state.poisson(words_per_review, n) + 1
+
+		# each word is drawn from the topic of the business with probability 1/2 and from a topic of the costumer otherwise; the words of all 
+		# reviews of the chunk are drawn at once, topic by topic
+		review = np.repeat(np.arange(n), lengths)
+		own = random_state.random_sample(len(review)) < 0.5
+		cumulative_users = np.cumsum(user_topics[users[review]], 1)
+		k = np.minimum((cumulative_users < random_state.random_sample(len(review))[:, np.newaxis]).sum(1), n_topics - 1)
+		k = np.where(own, business_topic[businesses[review]], k)
+		u = random_state.random_sample(len(review))
+		w = np.empty(len(review), dtype=np.int64)
+		for t in range(0,n_topics):
+			words = np.nonzero(k == t)[0]
+			w[words] = np.minimum(np.searchsorted(cumulative_topics[t], u[words]), vocab_size - 1)
+		texts = np.split(vocab[w], np.cumsum(lengths)[:-1])
+
+		for i in range(0,n):
+			yield {'review_id': 'r{}'.format(offset + i), 'user_id': 'u{}'.format(users[i]), 'business_id': 'b{}'.format(businesses[i]),
+				'stars': int(stars[i]), 'date': (start + datetime.timedelta(days=int(dates[i]))).isoformat(), 'text': ' '.join(texts[i])}
+
+def write(path, n_reviews, **options):
+	""" writes n_reviews synthetic reviews (see generate) to the .json file path as a list of reviews, one review per line """
+	directory = os.path.dirname(path)
+	if directory and not os.path.isdir(directory):
+		os.makedirs(directory)
+	with open(path, 'w') as fp:
+		fp.write('[')
+		for i, review in enumerate(generate(n_reviews, **options)):
+			fp.write((',\n' if i else '\n') + json.dumps(review))
+		fp.write('\n]\n')
+
+def main():
+	write(os.path.join(sys.argv[1], 'reviews_Madison.json'), int(sys.argv[2]))
+
+if __name__ == '__main__':	main()
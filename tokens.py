@@ -0,0 +1,59 @@
+# This file implements the token normalization used for the review texts, both when building the dictionary (Dictionary.py) and when computing
+# the bag of words representation of the reviews (LDA.py), so that both produce identical tokens. A review is set to lower case, split into words,
+# stripped of stopwords, its plurals are reduced to their singular (by deleting the 's' at the end of words tagged as plural nouns) and, if a
+# vocabulary is given, restricted to the words of that vocabulary. The stopword and vocabulary filters are hash sets that are compiled once, and
+# the part of speech tagging is done for a whole batch of reviews at once.
+#
+# Each review is tagged as a sentence of its own (nltk.pos_tag_sents), whereas the original Dictionary.py tagged the concatenated text of all reviews
+# (and, separately, of all bad reviews). The tag of a word can depend on its neighbours, so the words at the border of two reviews may be tagged
+# differently, and the plurals that are stripped, and with them dictionary.txt and monroe.csv, can differ slightly from the original outputs. This is
+# deliberate: the tokens of a review now depend only on the review itself, so that they are the same in Dictionary.py, LDA.setting and inference.py,
+# in the full and in the bad reviews, and for any batch size or number of processes.
+
+# we load required packages
+import re, nltk
+from nltk.corpus import stopwords
+
+# we define the tokenizer (this is the pattern of nltk's RegexpTokenizer(r'\w+'))
+WORD = re.compile(r'\w+', re.UNICODE | re.MULTILINE | re.DOTALL)
+
+class TokenPipeline:
+	def __init__(self, vocab=None, stop=None, strip_plurals=True):
+		""" vocab is an optional list of words to restrict the tokens to; stop is the list of stopwords (english stopwords by default);
+		strip_plurals specifies whether plurals are reduced to their singular """
+		if stop is None:
+			stop = stopwords.words('english')
+		self.stop = frozenset(stop)
+		self.vocab = frozenset(vocab) if vocab is not None else None
+		self.strip_plurals = strip_plurals
+
+	def tokenize(self, text):
+		""" lower case words of text without stopwords """
+		stop = self.stop
+		return [w for w in WORD.findall(text.lower()) if w not in stop]
+
+	def singular(self, docs):
+		""" reduces the words tagged as plural nouns in a batch of tokenized texts docs to their singular """
+		tagged = nltk.pos_tag_sents(docs)
+		return [[w[:-1] if (t == 'NNS' and w.endswith('s')) else w for w, t in doc] for doc in tagged]
+
+	def __call__(self, texts):
+		""" returns the list of tokens for each text in the batch texts """
+		docs = [self.tokenize(text) for text in texts]
+		if self.strip_plurals:
+			docs = self.singular(docs)
+		if self.vocab is not None:
+			vocab = self.vocab
+			docs = [[w for w in doc if w in vocab] for doc in docs]
+		return docs
+
+def batches(items, size):
+	""" splits the iterable items into lists of (at most) size elements """
+	batch = []
+	for item in items:
+		batch.append(item)
+		if len(batch) == size:
+			yield batch
+			batch = []
+	if batch:
+		yield batch
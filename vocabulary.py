@@ -0,0 +1,35 @@
+# This file implements the selection of the dictionary from the word counts of the reviews (see Dictionary.py). The counts are held in one array (in
+# the order in which the words first occur in the reviews), which is sorted once by decreasing count (a stable sort, so that words with the same count
+# keep their order and the ranking is the same as that of Counter.most_common); the dictionary of n words is then the first n words of this ranking.
+# The size of the dictionary can also be chosen from the cumulative proportion of all word occurences that the most frequent words account for (their
+# coverage): either as the smallest number of words that reach a given coverage, or at the elbow of the coverage curve, i.e. where adding further
+# words stops increasing the coverage noticeably.
+
+# we load required packages
+import numpy as np
+
+def ranked(counts):
+	""" indices of all words by decreasing count (words with the same count in their original order) """
+	counts = np.asarray(counts)
+	return np.argsort(-counts, kind='mergesort')
+
+def coverage(counts):
+	""" cumulative proportion of all word occurences covered by the 1, 2, ... most frequent words """
+	sorted_counts = np.sort(np.asarray(counts, dtype=np.float64))[::-1]
+	total = sorted_counts.sum()
+	return np.cumsum(sorted_counts) / total if total > 0 else np.zeros(len(sorted_counts))
+
+def coverage_size(counts, target):
+	""" the smallest number of most frequent words that cover at least the proportion target of all word occurences """
+	return min(int(np.searchsorted(coverage(counts), target, side='left')) + 1, len(counts))
+
+def elbow_size(counts, min_count=2):
+	""" the number of most frequent words at the elbow of the coverage curve of the words that occur at least min_count times, i.e. the point of the
+	curve that is farthest above the straight line from no words to all of these words """
+	counts = np.asarray(counts)
+	counts = counts[counts >= min_count]
+	if len(counts) == 0:
+		return 0
+	c = coverage(counts)
+	x = np.arange(1, len(c) + 1) / float(len(c))
+	return int(np.argmax(c - x)) + 1
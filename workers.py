@@ -0,0 +1,47 @@
+# This file contains the helpers for running jobs on a pool of processes (see sweep.py and gibbs.py). Large read-only data (e.g. the count matrix of
+# the reviews) is not sent to the worker processes with each job; instead it is stored in shared before the pool is started and handed to each worker
+# once when it starts (see init_worker), and the jobs only carry their parameters. This works with every start method of multiprocessing: with fork
+# (the default on Linux) the workers inherit the data without copying it, with spawn (the default on macOS and Windows) it is sent to each worker once.
+
+# usage:
+#	shared['Y'] = Y
+#	results = run_pool(function, jobs, n_jobs)
+# where function reads shared['Y']
+
+# we load required packages
+import multiprocessing
+
+# data shared with the worker processes; it is set before the pool of processes is started and only read afterwards
+shared = {}
+
+def init_worker(data):
+	""" sets the shared data in a new worker process """
+	shared.clear()
+	shared.update(data)
+
+def start_pool(n_jobs):
+	""" a pool of n_jobs processes that start with the current contents of shared (None if n_jobs is 1, i.e. the jobs are run in the current
+	process) """
+	if n_jobs <= 1:
+		return None
+	data = dict((key, value) for key, value in shared.items() if value is not None)
+	return multiprocessing.Pool(n_jobs, initializer=init_worker, initargs=(data,))
+
+def stop_pool(pool):
+	if pool is not None:
+		pool.close()
+		pool.join()
+
+def map_pool(pool, function, jobs):
+	""" applies function to each job, using pool (or the current process if pool is None) """
+	if pool is not None:
+		return pool.map(function, jobs, chunksize=1)
+	return [function(job) for job in jobs]
+
+def run_pool(function, jobs, n_jobs):
+	""" applies function to each job, using a new pool of n_jobs processes """
+	pool = start_pool(n_jobs)
+	try:
+		return map_pool(pool, function, jobs)
+	finally:
+		stop_pool(pool)